@@ -1,13 +1,50 @@
 # api_server.py
 
-from fastapi import FastAPI
-from pydantic import BaseModel
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, ValidationError
 import numpy as np
+from core import instrumentation
+from core.geometry import CTGeometry
+from core.iterative import ITERATIVE_METHODS
+from openrbyr.array_transport import (BINARY_TYPES, DTYPE_HEADER, JSON, SHAPE_HEADER, decode_array,
+                                      encode_array, media_type, negotiate)
+from openrbyr.jobs import CANCELLED, DONE, FAILED, JobManager, JobQueueFull, report_progress
 from openrbyr.ray_simulation import RaySimulation
 from openrbyr.monte_carlo import MonteCarloSimulation
-from openrbyr.reconstruction import MARTReconstruction
+from openrbyr.reconstruction import IterativeReconstruction, MARTReconstruction
+from openrbyr.result_cache import DEFAULT_MAX_BYTES, DEFAULT_MAX_DISK_BYTES, ResultCache, request_key
+
+# Long simulations run as jobs on a process pool; submissions beyond
+# OPENRBYR_MAX_PENDING_JOBS queued or running jobs are rejected with 429.
+jobs = JobManager(max_workers=int(os.environ.get("OPENRBYR_JOB_WORKERS", 0)) or None,
+                  max_pending=int(os.environ.get("OPENRBYR_MAX_PENDING_JOBS", 16)))
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    jobs.shutdown(wait=False)
+
+app = FastAPI(lifespan=lifespan)
+
+# Hot-path spans and counters for /metrics, aggregated without per-call events.
+# Opt-in because instrumented functions then take a lock per call.
+if os.environ.get("OPENRBYR_METRICS"):
+    instrumentation.enable(instrumentation.Recorder(max_events=0))
 
-app = FastAPI()
+# Results of deterministic requests, keyed by request content. Set
+# OPENRBYR_RESULT_CACHE_DIR to keep them on disk across restarts, within
+# OPENRBYR_RESULT_CACHE_DISK_BYTES.
+results = ResultCache(max_bytes=int(os.environ.get("OPENRBYR_RESULT_CACHE_BYTES", DEFAULT_MAX_BYTES)),
+                      cache_dir=os.environ.get("OPENRBYR_RESULT_CACHE_DIR") or None,
+                      max_disk_bytes=int(os.environ.get("OPENRBYR_RESULT_CACHE_DISK_BYTES",
+                                                        DEFAULT_MAX_DISK_BYTES)))
 
 # Define request models
 class RaySimulationRequest(BaseModel):
@@ -17,33 +54,222 @@ class RaySimulationRequest(BaseModel):
 class MonteCarloRequest(BaseModel):
     num_particles: int
     detector_distance: float
+    energy_kev: float = 60.0
+    seed: Optional[int] = None
 
-class ReconstructionRequest(BaseModel):
-    projections: list
+class ScannerGeometry(BaseModel):
+    detector_spacing: float
+    source_to_center: float
+    source_to_detector: float
+    pixel_size: float = 1.0
+    image_size: int = 128
+
+class ReconstructionParams(BaseModel):
     num_iterations: int
+    geometry: Optional[ScannerGeometry] = None
+    method: str = "mart"
+    num_subsets: int = 10
+    relaxation: float = 1.0
+    tol: Optional[float] = None
 
-@app.get("/")
-def read_root():
-    return {"message": "Welcome to the OpenRBYR API!"}
+class ReconstructionRequest(ReconstructionParams):
+    projections: list
 
-@app.post("/simulate_rays")
-def simulate_rays(request: RaySimulationRequest):
+# Computations shared by the synchronous endpoints and the job queue. They
+# take the request model, so they can be pickled into a pool worker, and
+# report progress when they run as a job.
+def compute_rays(request: RaySimulationRequest):
     sim = RaySimulation(request.num_rays, request.detector_distance)
     rays = sim.simulate_rays()
     return {"rays": rays}
 
-@app.post("/monte_carlo")
-def run_monte_carlo(request: MonteCarloRequest):
-    mc_sim = MonteCarloSimulation(request.num_particles, request.detector_distance)
-    interactions = mc_sim.run_simulation()
+def compute_monte_carlo(request: MonteCarloRequest):
+    mc_sim = MonteCarloSimulation(request.num_particles, request.detector_distance,
+                                  energy_kev=request.energy_kev, seed=request.seed)
+    interactions = mc_sim.run_simulation(progress=report_progress)
     results = mc_sim.analyze_results(interactions)
     return {"results": results}
 
+def compute_reconstruction(request: ReconstructionParams, projections):
+    if request.geometry is None:
+        recon = MARTReconstruction(request.num_iterations)
+    else:
+        geo = request.geometry
+        geometry = CTGeometry(projections.shape[0], projections.shape[1], geo.detector_spacing,
+                              geo.source_to_center, geo.source_to_detector)
+        recon = IterativeReconstruction(geometry, (geo.image_size, geo.image_size),
+                                        method=request.method,
+                                        num_iterations=request.num_iterations,
+                                        num_subsets=request.num_subsets,
+                                        relaxation=request.relaxation,
+                                        tol=request.tol, pixel_size=geo.pixel_size)
+    reconstructed_image = recon.reconstruct(projections, progress=report_progress)
+    return {"reconstructed_image": reconstructed_image}
+
+async def read_reconstruction(request: Request):
+    """
+    Parse a reconstruction request into (params, projections).
+
+    A JSON body is a ReconstructionRequest. A binary body (see
+    openrbyr.array_transport) is the projection array itself, and the other
+    parameters, including the geometry fields, come from the query string.
+    """
+    content_type = media_type(request.headers.get("content-type"))
+    body = await request.body()
+    try:
+        if content_type in BINARY_TYPES:
+            try:
+                projections = decode_array(body, content_type, request.headers.get(DTYPE_HEADER),
+                                           request.headers.get(SHAPE_HEADER))
+            except ValueError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+            query = dict(request.query_params)
+            geometry = {name: query.pop(name) for name in ScannerGeometry.model_fields if name in query}
+            if geometry:
+                query["geometry"] = geometry
+            params = ReconstructionParams.model_validate(query)
+        elif content_type in ("", JSON):
+            params = ReconstructionRequest.model_validate_json(body)
+            projections = params.projections
+        else:
+            raise HTTPException(status_code=415, detail=f"Unsupported Content-Type '{content_type}'")
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+
+    projections = np.asarray(projections, dtype=float)
+    if params.geometry is not None:
+        if projections.ndim != 2:
+            raise HTTPException(status_code=422, detail="Projections must be [angles x detectors]")
+        if params.method not in ITERATIVE_METHODS:
+            raise HTTPException(status_code=422,
+                                detail=f"Unknown method '{params.method}'. Use one of {sorted(ITERATIVE_METHODS)}")
+    return params, projections
+
+def jsonable(value):
+    if isinstance(value, dict):
+        return {key: jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    return value
+
+def encode_result(result, accept):
+    """
+    Response for a result dict, encoded per the Accept header.
+
+    Binary encodings apply to results holding a single array; everything else
+    is returned as JSON.
+    """
+    encoding = negotiate(accept)
+    if encoding is None:
+        raise HTTPException(status_code=406, detail="Acceptable encodings: JSON, " + ", ".join(BINARY_TYPES))
+    if encoding == JSON:
+        return JSONResponse(jsonable(result))
+    arrays = [value for value in result.values() if isinstance(value, np.ndarray)]
+    if len(arrays) != 1:
+        raise HTTPException(status_code=406, detail="This result is only available as JSON")
+    body, headers = encode_array(arrays[0], encoding)
+    return Response(body, media_type=encoding, headers=headers)
+
+def cached(endpoint, params, compute, *arrays):
+    """Return (result, "HIT" | "MISS") for a deterministic computation."""
+    key = request_key(endpoint, params, *arrays)
+    result = results.get(key)
+    if result is not None:
+        return result, "HIT"
+    return results.put(key, compute()), "MISS"
+
+def submit_job(func, *args):
+    try:
+        job_id = jobs.submit(func, *args, name=func.__name__)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    return JSONResponse(status_code=202, content=jobs.status(job_id),
+                        headers={"Location": f"/jobs/{job_id}"})
+
+@app.get("/")
+def read_root():
+    return {"message": "Welcome to the OpenRBYR API!"}
+
+@app.post("/simulate_rays")
+def simulate_rays(request: RaySimulationRequest, response: Response):
+    result, response.headers["X-Cache"] = cached("simulate_rays", request.model_dump(),
+                                                 lambda: compute_rays(request))
+    return result
+
+@app.post("/monte_carlo")
+def run_monte_carlo(request: MonteCarloRequest, response: Response):
+    # Unseeded runs draw fresh entropy, so only seeded ones are cacheable.
+    if request.seed is None:
+        response.headers["X-Cache"] = "BYPASS"
+        return compute_monte_carlo(request)
+    result, response.headers["X-Cache"] = cached("monte_carlo", request.model_dump(),
+                                                 lambda: compute_monte_carlo(request))
+    return result
+
 @app.post("/reconstruct")
-def reconstruct_image(request: ReconstructionRequest):
-    recon = MARTReconstruction(request.num_iterations)
-    reconstructed_image = recon.reconstruct(np.array(request.projections))
-    return {"reconstructed_image": reconstructed_image.tolist()}
+async def reconstruct_image(request: Request):
+    params, projections = await read_reconstruction(request)
+    result, status = await run_in_threadpool(
+        cached, "reconstruct", params.model_dump(exclude={"projections"}),
+        lambda: compute_reconstruction(params, projections), projections)
+    response = encode_result(result, request.headers.get("accept"))
+    response.headers["X-Cache"] = status
+    return response
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus exposition of the spans and counters recorded in this process (not in job workers)."""
+    recorder = instrumentation.get_recorder()
+    if recorder is None:
+        return "# instrumentation disabled; set OPENRBYR_METRICS=1 to enable\n"
+    return recorder.prometheus()
+
+@app.get("/cache/stats")
+def cache_stats():
+    return results.stats()
+
+@app.post("/jobs/simulate_rays", status_code=202)
+def submit_simulate_rays(request: RaySimulationRequest):
+    return submit_job(compute_rays, request)
+
+@app.post("/jobs/monte_carlo", status_code=202)
+def submit_monte_carlo(request: MonteCarloRequest):
+    return submit_job(compute_monte_carlo, request)
+
+@app.post("/jobs/reconstruct", status_code=202)
+async def submit_reconstruction(request: Request):
+    params, projections = await read_reconstruction(request)
+    return submit_job(compute_reconstruction, params, projections)
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    status = jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return status
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str, accept: Optional[str] = Header(None)):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    if job.status == DONE:
+        return encode_result(job.result, accept)
+    if job.status == FAILED:
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status == CANCELLED:
+        raise HTTPException(status_code=410, detail="Job was cancelled")
+    return JSONResponse(status_code=202, content=job.describe())
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    if jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    if not jobs.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job already finished")
+    return jobs.status(job_id)
 
 if __name__ == "__main__":
     import uvicorn
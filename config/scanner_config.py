@@ -6,6 +6,8 @@ import json
 import yaml
 import os
 
+import numpy as np
+
 def load_config(filepath):
     """
     Load a scanner configuration file.
@@ -45,6 +47,37 @@ def save_config(config, filepath):
         else:
             raise ValueError("Unsupported file format. Use .json or .yaml")
 
+def geometry_from_config(config):
+    """
+    Build a core.geometry scanner geometry from a configuration dictionary.
+
+    Args:
+        config (dict): Scanner configuration. "geometry" selects "fan" (default,
+            CTGeometry), "parallel" (ParallelBeamGeometry) or "cone"
+            (ConeBeamGeometry); the other keys are that class's arguments.
+            num_angles defaults to 360; unrelated keys are ignored.
+
+    Returns:
+        CTGeometry: The geometry
+    """
+    from core.geometry import ConeBeamGeometry, CTGeometry, ParallelBeamGeometry
+
+    kind = config.get("geometry", "fan")
+    num_angles = config.get("num_angles", 360)
+    if kind == "fan":
+        return CTGeometry(num_angles, config["num_detectors"], config["detector_spacing"],
+                          config["source_to_center"], config["source_to_detector"])
+    if kind == "parallel":
+        return ParallelBeamGeometry(num_angles, config["num_detectors"], config["detector_spacing"],
+                                    angular_range=config.get("angular_range", np.pi),
+                                    radius=config.get("radius"))
+    if kind == "cone":
+        return ConeBeamGeometry(num_angles, config["num_detectors"], config["detector_spacing"],
+                                config["source_to_center"], config["source_to_detector"],
+                                config["num_rows"], config["row_spacing"],
+                                config.get("detector_type", "curved"))
+    raise ValueError(f"Unknown geometry '{kind}'. Use 'fan', 'parallel' or 'cone'")
+
 if __name__ == "__main__":
     # Example usage
     config = {
@@ -57,4 +90,5 @@ if __name__ == "__main__":
     save_config(config, "scanner_config.yaml")
     loaded = load_config("scanner_config.yaml")
     print("Loaded Config:", loaded)
+    geometry_from_config(loaded).describe()
 
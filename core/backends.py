@@ -0,0 +1,90 @@
+# core/backends.py
+"""
+Compute backend selection for the ray-tracing kernels.
+
+"numpy" is the vectorized pure-NumPy implementation and always available.
+"numba" JIT-compiles per-ray kernels with parallel loops over rays
+(core._numba_kernels) and requires the optional numba package. "auto" picks
+numba when it is installed and numpy otherwise.
+
+The global default comes from $OPENRBYR_BACKEND (or "numpy") and can be changed
+with set_backend or, for a block, use_backend. Functions taking a ``backend``
+argument (trace_rays, forward_project, backproject, build_system_matrix,
+fan_beam_fbp) override it per call. Both backends agree to floating-point
+rounding.
+"""
+import importlib.util
+import os
+from contextlib import contextmanager
+
+import numpy as np
+
+BACKENDS = ("numpy", "numba", "auto")
+
+NUMBA_AVAILABLE = importlib.util.find_spec("numba") is not None
+
+_default_backend = os.environ.get("OPENRBYR_BACKEND", "numpy")
+
+
+def available_backends():
+    """Concrete backends usable in this environment."""
+    return ["numpy", "numba"] if NUMBA_AVAILABLE else ["numpy"]
+
+
+def resolve_backend(backend=None):
+    """
+    Turn a backend argument into "numpy" or "numba".
+
+    Args:
+        backend (str): "numpy", "numba", "auto", or None for the global default
+
+    Returns:
+        str: The concrete backend to run
+    """
+    backend = backend or _default_backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Use one of {list(BACKENDS)}")
+    if backend == "auto":
+        return "numba" if NUMBA_AVAILABLE else "numpy"
+    if backend == "numba" and not NUMBA_AVAILABLE:
+        raise ImportError("The numba backend requires the numba package (pip install numba)")
+    return backend
+
+
+def get_backend():
+    """The global default backend name (may be "auto")."""
+    return _default_backend
+
+
+def set_backend(backend):
+    """Set the global default backend; raises if it is unknown or unavailable."""
+    global _default_backend
+    resolve_backend(backend)
+    _default_backend = backend
+
+
+@contextmanager
+def use_backend(backend):
+    """Use backend as the global default inside the block."""
+    previous = _default_backend
+    set_backend(backend)
+    try:
+        yield
+    finally:
+        set_backend(previous)
+
+
+def flat_rays(sources, detectors):
+    """Contiguous float64 (starts, ends) [N x 2] of every ray of a (sources, detectors) pair."""
+    detectors = np.asarray(detectors, dtype=np.float64)
+    sources = np.asarray(sources, dtype=np.float64)
+    if sources.ndim == detectors.ndim - 1:
+        sources = sources[:, np.newaxis, :]
+    starts = np.broadcast_to(sources, detectors.shape).reshape(-1, 2)
+    return np.ascontiguousarray(starts), np.ascontiguousarray(detectors.reshape(-1, 2))
+
+
+def numba_kernels():
+    """The compiled kernel module (imported on first use)."""
+    from core import _numba_kernels
+    return _numba_kernels
@@ -5,6 +5,9 @@ Simulate CT detector imperfections: blur, saturation, and noise.
 import numpy as np
 from scipy.ndimage import gaussian_filter
 
+from core.instrumentation import count, instrument
+
+@instrument()
 def apply_detector_blur(sinogram, sigma=2):
     """
     Applies Gaussian blur across detectors to simulate detector PSF (point spread function).
@@ -16,33 +19,38 @@ def apply_detector_blur(sinogram, sigma=2):
     Returns:
         np.ndarray: Blurred sinogram
     """
+    count("bytes_allocated", np.asarray(sinogram).nbytes)
     return gaussian_filter(sinogram, sigma=(0, sigma))
 
-def apply_saturation(sinogram, max_value=5.0):
+@instrument()
+def apply_saturation(sinogram, max_value=5.0, out=None):
     """
     Simulate detector saturation by clipping high attenuation values.
 
     Args:
         sinogram (np.ndarray): Input sinogram
         max_value (float): Maximum log attenuation before saturation
+        out (np.ndarray): Optional output buffer (may be sinogram itself)
 
     Returns:
         np.ndarray: Saturated sinogram
     """
-    return np.clip(sinogram, a_min=0, a_max=max_value)
+    return np.clip(sinogram, a_min=0, a_max=max_value, out=out)
 
-def apply_detector_gain(sinogram, gain_map):
+@instrument()
+def apply_detector_gain(sinogram, gain_map, out=None):
     """
     Apply per-detector gain variation.
 
     Args:
         sinogram (np.ndarray): Input sinogram
         gain_map (np.ndarray): 1D array with detector multipliers [detectors]
+        out (np.ndarray): Optional output buffer (may be sinogram itself)
 
     Returns:
         np.ndarray: Gain-modified sinogram
     """
-    return sinogram * gain_map[np.newaxis, :]
+    return np.multiply(sinogram, gain_map[np.newaxis, :], out=out)
 
 if __name__ == "__main__":
     print("Detector models module loaded.")
@@ -3,8 +3,12 @@
 CT reconstruction filters for Filtered Backprojection (FBP):
 Includes Ram-Lak, Shepp-Logan, Hamming filters in the frequency domain.
 """
+from functools import lru_cache
+
 import numpy as np
-import scipy.fftpack as fft
+import scipy.fft as fft
+
+from core.instrumentation import count, instrument
 
 def ramp_filter(size):
     """
@@ -25,28 +29,71 @@ def hamming_filter(size):
     hamming_window = 0.54 + 0.46 * np.cos(np.pi * freqs / np.max(freqs))
     return ramp * hamming_window
 
-def apply_filter(sinogram, filter_func):
+FILTERS = {
+    "ramp": ramp_filter,
+    "ram-lak": ramp_filter,
+    "shepp-logan": shepp_logan_filter,
+    "hamming": hamming_filter,
+}
+
+def padded_length(num_detectors):
     """
-    Apply the given frequency filter to the sinogram.
+    Zero-padded FFT length for filtering rows of num_detectors samples.
+
+    Padding to at least twice the row length turns the circular convolution of
+    the FFT into a linear one; the result is rounded up to the next length
+    scipy.fft handles fast (products of 2, 3, 5).
+    """
+    return fft.next_fast_len(2 * num_detectors, real=True)
+
+@lru_cache(maxsize=64)
+def get_filter_kernel(filter_func, padded_size, dtype=np.float64):
+    """
+    Half-spectrum (rfft) kernel of a filter, cached per (filter, padded size, dtype).
 
     Args:
-        sinogram (np.ndarray): [angles x detectors]
-        filter_func (function): one of the filters above
+        filter_func (function or str): One of the filters above or its name in FILTERS
+        padded_size (int): FFT length the kernel is applied at
+        dtype (np.dtype): Real dtype of the kernel
 
     Returns:
-        np.ndarray: Filtered sinogram
+        np.ndarray: Read-only kernel of length padded_size // 2 + 1
     """
-    filtered = np.zeros_like(sinogram)
-    n_angles, n_detectors = sinogram.shape
-    filt = filter_func(n_detectors)
+    if isinstance(filter_func, str):
+        filter_func = FILTERS[filter_func.lower()]
+    kernel = filter_func(padded_size)[:padded_size // 2 + 1, 0].astype(dtype)
+    kernel.setflags(write=False)
+    return kernel
 
-    for i in range(n_angles):
-        proj_fft = fft.fft(sinogram[i])
-        proj_fft *= filt[:, 0]  # Apply filter
-        filtered[i] = np.real(fft.ifft(proj_fft))
+@instrument()
+def apply_filter(sinogram, filter_func=ramp_filter, pad=True, workers=None):
+    """
+    Apply the given frequency filter to the sinogram.
+
+    All rows are filtered with one batched rfft/irfft pair along the detector
+    axis, so a stack of sinograms [..., angles, detectors] is filtered in a
+    single call. Kernels come from get_filter_kernel's cache; scipy.fft keeps
+    its own plan cache, which is reused since the padded length is fixed.
+
+    Args:
+        sinogram (np.ndarray): [angles x detectors], or any stack [..., detectors]
+        filter_func (function or str): one of the filters above or its name
+        pad (bool): zero-pad rows to padded_length() to avoid wrap-around artifacts
+        workers (int): threads used by scipy.fft (None for its default)
 
-    return filtered
+    Returns:
+        np.ndarray: filtered sinogram, float32 for float32 input and float64 otherwise
+    """
+    sinogram = np.asarray(sinogram)
+    dtype = np.float32 if sinogram.dtype == np.float32 else np.float64
+    n_detectors = sinogram.shape[-1]
+    n_fft = padded_length(n_detectors) if pad else n_detectors
+
+    proj_fft = fft.rfft(sinogram.astype(dtype, copy=False), n=n_fft, axis=-1, workers=workers)
+    proj_fft *= get_filter_kernel(filter_func, n_fft, np.dtype(dtype))  # Apply filter
+    filtered = fft.irfft(proj_fft, n=n_fft, axis=-1, workers=workers, overwrite_x=True)
+    count("bytes_allocated", proj_fft.nbytes + filtered.nbytes)
+    return np.ascontiguousarray(filtered[..., :n_detectors])
 
 if __name__ == "__main__":
     print("CT reconstruction filters module ready.")
-
@@ -1,6 +1,6 @@
 # core/geometry.py
 """
-Defines CT scanner geometry for 2D fan-beam simulations.
+Defines CT scanner geometry for 2D fan-beam, 2D parallel-beam and 3D cone-beam simulations.
 """
 import numpy as np
 
@@ -22,13 +22,21 @@ class CTGeometry:
         y = self.source_to_center * np.sin(angle_rad)
         return np.array([x, y])
 
+    def get_fan_angles(self):
+        """
+        Returns the fan angle (in radians) of each detector, measured at the source
+        from the central ray. Detector k sees the ray leaving the source at
+        angle_rad + pi - fan_angles[k].
+        """
+        arc = np.linspace(-self.num_detectors // 2, self.num_detectors // 2, self.num_detectors)
+        return arc * self.detector_spacing / self.source_to_detector
+
     def get_detector_positions(self, angle_rad):
         """
         Returns the (x, y) positions of each detector at a given projection angle.
         Detectors are assumed to lie on a circular arc centered at the rotation center.
         """
-        arc = np.linspace(-self.num_detectors // 2, self.num_detectors // 2, self.num_detectors)
-        angle_offsets = arc * self.detector_spacing / self.source_to_detector
+        angle_offsets = self.get_fan_angles()
 
         det_angles = angle_rad + np.pi - angle_offsets
         x = self.source_to_center * np.cos(angle_rad) + self.source_to_detector * np.cos(det_angles)
@@ -43,3 +51,104 @@ class CTGeometry:
         print(f"  Source-to-Center: {self.source_to_center} mm")
         print(f"  Source-to-Detector: {self.source_to_detector} mm")
 
+class ConeBeamGeometry(CTGeometry):
+    """
+    Circular cone-beam scan: the fan-beam geometry of CTGeometry in the
+    z = 0 plane, extended with detector rows along z.
+
+    The detector is either "curved" (a cylinder centred on the source, with
+    columns at CTGeometry's equiangular fan angles) or "flat" (a plane at
+    source_to_detector from the source, with columns detector_spacing apart).
+    """
+
+    def __init__(self, num_angles, num_detectors, detector_spacing, source_to_center, source_to_detector,
+                 num_rows, row_spacing, detector_type="curved"):
+        if detector_type not in ("curved", "flat"):
+            raise ValueError(f"detector_type must be 'curved' or 'flat', not '{detector_type}'")
+        super().__init__(num_angles, num_detectors, detector_spacing, source_to_center, source_to_detector)
+        self.num_rows = num_rows
+        self.row_spacing = row_spacing
+        self.detector_type = detector_type
+
+    def get_column_positions(self):
+        """
+        Returns the detector column coordinates: fan angles in radians for a
+        curved detector, in-plane offsets u (mm) for a flat one.
+        """
+        if self.detector_type == "curved":
+            return super().get_fan_angles()
+        arc = np.linspace(-self.num_detectors // 2, self.num_detectors // 2, self.num_detectors)
+        return arc * self.detector_spacing
+
+    def get_fan_angles(self):
+        """Returns the in-plane fan angle (in radians) of each detector column."""
+        if self.detector_type == "curved":
+            return super().get_fan_angles()
+        return np.arctan(self.get_column_positions() / self.source_to_detector)
+
+    def get_row_positions(self):
+        """Returns the z coordinate (mm) of each detector row on the detector."""
+        return (np.arange(self.num_rows) - (self.num_rows - 1) / 2) * self.row_spacing
+
+    def get_cone_angle(self):
+        """Returns the half cone angle (in radians) subtended by the outermost rows."""
+        return np.arctan(np.abs(self.get_row_positions()).max() / self.source_to_detector)
+
+    def get_source_position(self, angle_rad):
+        """Returns the (x, y, z) position of the X-ray source at a given angle."""
+        return np.array([self.source_to_center * np.cos(angle_rad),
+                         self.source_to_center * np.sin(angle_rad), 0.0])
+
+    def get_detector_positions(self, angle_rad):
+        """
+        Returns the (x, y, z) positions of every detector cell [rows x columns x 3]
+        at a given projection angle.
+        """
+        source = self.get_source_position(angle_rad)
+        rows = self.get_row_positions()[:, np.newaxis]
+        if self.detector_type == "curved":
+            det_angles = angle_rad + np.pi - self.get_fan_angles()
+            x = source[0] + self.source_to_detector * np.cos(det_angles)
+            y = source[1] + self.source_to_detector * np.sin(det_angles)
+        else:
+            u = self.get_column_positions()
+            x = source[0] - self.source_to_detector * np.cos(angle_rad) - u * np.sin(angle_rad)
+            y = source[1] - self.source_to_detector * np.sin(angle_rad) + u * np.cos(angle_rad)
+        shape = (self.num_rows, self.num_detectors)
+        return np.stack((np.broadcast_to(x, shape), np.broadcast_to(y, shape), np.broadcast_to(rows, shape)),
+                        axis=-1)
+
+    def describe(self):
+        super().describe()
+        print(f"  Detector Rows: {self.num_rows} ({self.detector_type})")
+        print(f"  Row Spacing: {self.row_spacing} mm")
+        print(f"  Half Cone Angle: {np.degrees(self.get_cone_angle()):.2f} deg")
+
+class ParallelBeamGeometry:
+    """
+    2D parallel-beam scan: at angle theta every ray runs along (-sin theta, cos theta)
+    and detector k measures the line x cos(theta) + y sin(theta) = offset[k].
+    """
+
+    def __init__(self, num_angles, num_detectors, detector_spacing, angular_range=np.pi, radius=None):
+        self.num_angles = num_angles
+        self.num_detectors = num_detectors
+        self.detector_spacing = detector_spacing
+        self.angular_range = angular_range
+        # Half-length of the rays built by generate_ray_arrays; the default
+        # reaches past any image inside the detector's field of view.
+        self.radius = radius if radius is not None else num_detectors * detector_spacing
+
+    def get_angles(self):
+        """Returns an array of evenly spaced projection angles (in radians)."""
+        return np.linspace(0, self.angular_range, self.num_angles, endpoint=False)
+
+    def get_detector_offsets(self):
+        """Returns the signed distance of each detector's ray from the rotation axis."""
+        return (np.arange(self.num_detectors) - (self.num_detectors - 1) / 2) * self.detector_spacing
+
+    def describe(self):
+        print("Parallel-Beam Geometry Config:")
+        print(f"  Projections: {self.num_angles} over {np.degrees(self.angular_range):.0f} deg")
+        print(f"  Detectors: {self.num_detectors}")
+        print(f"  Detector Spacing: {self.detector_spacing} mm")
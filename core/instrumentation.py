@@ -0,0 +1,191 @@
+# core/instrumentation.py
+"""
+Opt-in timing spans and counters for the simulation hot paths.
+
+Instrumented functions are wrapped with @instrument and bump counters (rays
+traced, pixels touched, bytes allocated) with count(). Both are no-ops until a
+Recorder is active, so the disabled cost is one global lookup per call.
+
+Example:
+    with profiling() as recorder:
+        sinogram = forward_project(phantom, rays, phantom.shape)
+    print(recorder.summary_table())
+    recorder.save_chrome_trace("trace.json")   # open in chrome://tracing or Perfetto
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# The active Recorder, or None when instrumentation is off.
+_recorder = None
+
+
+class Recorder:
+    """
+    Collects spans and counters from every thread of this process.
+
+    Per-span aggregates (calls, total, min, max) are always kept. Individual
+    events for the Chrome trace are kept up to max_events (oldest dropped);
+    max_events=0 keeps aggregates only, which suits long-running servers.
+    """
+
+    def __init__(self, max_events=1_000_000):
+        self.max_events = max_events
+        self.events = deque(maxlen=max_events)
+        self.spans = {}
+        self.counters = {}
+        self.origin = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    def record(self, name, start_ns, end_ns):
+        duration = end_ns - start_ns
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                self.spans[name] = [1, duration, duration, duration]
+            else:
+                stats[0] += 1
+                stats[1] += duration
+                stats[2] = min(stats[2], duration)
+                stats[3] = max(stats[3], duration)
+            if self.max_events:
+                self.events.append((name, start_ns, duration, threading.get_ident()))
+
+    def add(self, name, value):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self.events.clear()
+            self.spans.clear()
+            self.counters.clear()
+            self.origin = time.perf_counter_ns()
+
+    def span_stats(self):
+        """Dict name -> {calls, total_s, mean_s, min_s, max_s}."""
+        with self._lock:
+            return {name: {"calls": calls, "total_s": total / 1e9, "mean_s": total / calls / 1e9,
+                           "min_s": low / 1e9, "max_s": high / 1e9}
+                    for name, (calls, total, low, high) in self.spans.items()}
+
+    def summary_table(self):
+        """Plain-text table of spans sorted by total time, followed by the counters."""
+        stats = sorted(self.span_stats().items(), key=lambda item: -item[1]["total_s"])
+        lines = [f"{'span':<40} {'calls':>9} {'total s':>10} {'mean ms':>10} {'max ms':>10}"]
+        for name, s in stats:
+            lines.append(f"{name:<40} {s['calls']:>9} {s['total_s']:>10.4f} "
+                         f"{s['mean_s'] * 1e3:>10.4f} {s['max_s'] * 1e3:>10.4f}")
+        with self._lock:
+            counters = sorted(self.counters.items())
+        if counters:
+            lines.append("")
+            lines.append(f"{'counter':<40} {'value':>21}")
+            lines.extend(f"{name:<40} {value:>21,}" for name, value in counters)
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        """Events in the Chrome trace-event format (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+            origin = self.origin
+        trace = [{"name": name, "cat": name.split(".")[0], "ph": "X", "pid": pid, "tid": tid,
+                  "ts": (start - origin) / 1e3, "dur": duration / 1e3}
+                 for name, start, duration, tid in events]
+        end = max((e["ts"] + e["dur"] for e in trace), default=0.0)
+        trace.extend({"name": name, "ph": "C", "pid": pid, "tid": 0, "ts": end, "args": {name: value}}
+                     for name, value in counters.items())
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def save_chrome_trace(self, filename):
+        with open(filename, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def prometheus(self, prefix="openrbyr"):
+        """Spans and counters in the Prometheus text exposition format."""
+        lines = [f"# TYPE {prefix}_span_seconds_total counter",
+                 f"# TYPE {prefix}_span_calls_total counter"]
+        for name, s in sorted(self.span_stats().items()):
+            lines.append(f'{prefix}_span_seconds_total{{span="{name}"}} {s["total_s"]:.9f}')
+            lines.append(f'{prefix}_span_calls_total{{span="{name}"}} {s["calls"]}')
+        with self._lock:
+            counters = sorted(self.counters.items())
+        for name, value in counters:
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+
+def enable(recorder=None):
+    """Start recording into recorder (a new Recorder by default) and return it."""
+    global _recorder
+    _recorder = recorder if recorder is not None else Recorder()
+    return _recorder
+
+
+def disable():
+    global _recorder
+    _recorder = None
+
+
+def get_recorder():
+    """The active Recorder, or None when instrumentation is off."""
+    return _recorder
+
+
+@contextmanager
+def profiling(recorder=None):
+    """Enable instrumentation for the duration of the block, restoring the previous state after."""
+    global _recorder
+    previous = _recorder
+    active = enable(recorder)
+    try:
+        yield active
+    finally:
+        _recorder = previous
+
+
+def instrument(name=None):
+    """Decorator timing every call of the wrapped function as a span."""
+    def decorate(func):
+        label = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = _recorder
+            if recorder is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                recorder.record(label, start, time.perf_counter_ns())
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def span(name):
+    """Time a block of code as a span."""
+    recorder = _recorder
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        recorder.record(name, start, time.perf_counter_ns())
+
+
+def count(name, value=1):
+    """Add value to a counter."""
+    recorder = _recorder
+    if recorder is not None:
+        recorder.add(name, int(value))
@@ -1,55 +1,212 @@
 # core/interpolation.py
 """
 Ray-pixel interpolation using Siddon's algorithm for 2D CT line integration.
+
+The image grid is centred on the rotation axis: pixel (i, j) covers
+x in [(i - nx/2) * pixel_size, (i - nx/2 + 1) * pixel_size) and the same
+for y with j, so the scanner rotates around the middle of the phantom.
 """
 import numpy as np
-from collections import Counter
 
-def siddons_algorithm(start, end, grid_shape, pixel_size):
+from core.backends import numba_kernels, resolve_backend
+from core.instrumentation import count, instrument
+
+# Upper bound on the number of (ray, alpha) entries sorted at once by trace_rays.
+_MAX_BATCH_ELEMENTS = 1 << 22
+
+
+@instrument()
+def trace_rays(starts, ends, grid_shape, pixel_size, backend=None):
     """
-    Siddon's algorithm for computing intersection lengths of a ray through a 2D grid.
+    Exact parametric Siddon/Jacobs tracing of many rays through a 2D grid.
+
+    For every ray the parametric values (alphas) at which it crosses each
+    vertical and horizontal grid line are computed with NumPy, clipped to the
+    segment [0, 1] and sorted. Consecutive alphas bound the segment inside a
+    single pixel, identified from the segment midpoint.
 
     Args:
-        start (tuple): (x0, y0) coordinates of the ray source
-        end (tuple): (x1, y1) coordinates of the detector
+        starts (np.ndarray): [N x 2] ray source coordinates
+        ends (np.ndarray): [N x 2] ray detector coordinates
         grid_shape (tuple): (num_rows, num_cols)
         pixel_size (float): physical size of each pixel
+        backend (str): "numpy", "numba" or "auto" (see core.backends); None for the default
 
     Returns:
-        list of tuples: [(i, j, length), ...] where (i, j) is the pixel index and length is the intersection length
+        tuple of np.ndarray: (ray_idx, i, j, length), one entry per ray/pixel intersection,
+        grouped by ray in increasing ray index
     """
-    x0, y0 = start
-    x1, y1 = end
+    starts = np.atleast_2d(np.asarray(starts, dtype=np.float64))
+    ends = np.atleast_2d(np.asarray(ends, dtype=np.float64))
     nx, ny = grid_shape
+    n_rays = starts.shape[0]
+
+    if resolve_backend(backend) == "numba":
+        traced = numba_kernels().trace_rays(np.ascontiguousarray(starts), np.ascontiguousarray(ends),
+                                            nx, ny, float(pixel_size))
+        count("rays_traced", n_rays)
+        count("pixels_touched", len(traced[0]))
+        return traced
+
+    x_min = -0.5 * nx * pixel_size
+    y_min = -0.5 * ny * pixel_size
+    x_planes = x_min + np.arange(nx + 1) * pixel_size
+    y_planes = y_min + np.arange(ny + 1) * pixel_size
+
+    n_alphas = nx + ny + 4
+    batch = max(1, _MAX_BATCH_ELEMENTS // n_alphas)
 
-    dx = x1 - x0
-    dy = y1 - y0
-    L = np.sqrt(dx**2 + dy**2)
+    ray_parts, i_parts, j_parts, len_parts = [], [], [], []
+    for lo in range(0, n_rays, batch):
+        hi = min(lo + batch, n_rays)
+        x0, y0 = starts[lo:hi, 0:1], starts[lo:hi, 1:2]
+        dx = ends[lo:hi, 0:1] - x0
+        dy = ends[lo:hi, 1:2] - y0
+        ray_length = np.sqrt(dx**2 + dy**2)
 
-    # Normalize direction
-    dx /= L
-    dy /= L
+        # Rays parallel to a set of grid lines never cross them: the division
+        # yields +-inf (or nan on a line), which is pushed to the segment ends.
+        alphas = np.empty((hi - lo, n_alphas))
+        alphas[:, 0] = 0.0
+        alphas[:, 1] = 1.0
+        alpha_x = alphas[:, 2:nx + 3]
+        alpha_y = alphas[:, nx + 3:]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(np.subtract(x_planes, x0, out=alpha_x), dx, out=alpha_x)
+            np.divide(np.subtract(y_planes, y0, out=alpha_y), dy, out=alpha_y)
+        np.nan_to_num(alphas, copy=False, nan=1.0, posinf=1.0, neginf=0.0)
+        np.clip(alphas, 0.0, 1.0, out=alphas)
+        alphas.sort(axis=1)
 
-    intersected = []
-    N = int(max(abs((x1 - x0) / pixel_size), abs((y1 - y0) / pixel_size)) * 2)
+        segment = np.diff(alphas, axis=1)
+        rows, cols = np.nonzero(segment > 0)
+        segment = segment[rows, cols]
+        mid = alphas[rows, cols] + 0.5 * segment
+        i = np.floor((x0[rows, 0] + mid * dx[rows, 0] - x_min) / pixel_size).astype(np.intp)
+        j = np.floor((y0[rows, 0] + mid * dy[rows, 0] - y_min) / pixel_size).astype(np.intp)
 
-    for step in np.linspace(0, L, N):
-        x = x0 + dx * step
-        y = y0 + dy * step
-        i = int(x / pixel_size)
-        j = int(y / pixel_size)
-        if 0 <= i < nx and 0 <= j < ny:
-            intersected.append((i, j))
+        inside = (i >= 0) & (i < nx) & (j >= 0) & (j < ny)
+        rows = rows[inside]
+        ray_parts.append(rows + lo)
+        i_parts.append(i[inside])
+        j_parts.append(j[inside])
+        len_parts.append(segment[inside] * ray_length[rows, 0])
+
+    count("rays_traced", n_rays)
+    count("pixels_touched", sum(len(part) for part in ray_parts))
+    if not ray_parts:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty, empty, np.empty(0)
+    return (np.concatenate(ray_parts), np.concatenate(i_parts),
+            np.concatenate(j_parts), np.concatenate(len_parts))
+
+
+@instrument()
+def trace_rays_3d(starts, ends, grid_shape, voxel_size, grid_min=None):
+    """
+    Exact Siddon/Jacobs tracing of many rays through a 3D voxel grid.
+
+    The 3D counterpart of trace_rays: crossings with the x, y and z planes are
+    merged by sorting and each segment is assigned to the voxel holding its
+    midpoint. By default the grid is centred on the origin like the 2D grid,
+    voxel (i, j, k) covering x in [(i - nx/2) * voxel_size, ...) and likewise
+    for y and z; grid_min places a sub-grid (e.g. a z-slab) elsewhere.
+
+    Args:
+        starts (np.ndarray): [N x 3] ray source coordinates
+        ends (np.ndarray): [N x 3] ray end coordinates
+        grid_shape (tuple): (nx, ny, nz)
+        voxel_size (float): physical size of each (cubic) voxel
+        grid_min (tuple): (x, y, z) of the grid's lower corner
+
+    Returns:
+        tuple of np.ndarray: (ray_idx, i, j, k, length), one entry per ray/voxel
+        intersection, grouped by ray in increasing ray index
+    """
+    starts = np.atleast_2d(np.asarray(starts, dtype=np.float64))
+    ends = np.atleast_2d(np.asarray(ends, dtype=np.float64))
+    shape = np.asarray(grid_shape)
+    n_rays = starts.shape[0]
+    if grid_min is None:
+        grid_min = -0.5 * shape * voxel_size
+    grid_min = np.asarray(grid_min, dtype=np.float64)
+    planes = [grid_min[axis] + np.arange(shape[axis] + 1) * voxel_size for axis in range(3)]
+
+    n_alphas = int(shape.sum()) + 5
+    batch = max(1, _MAX_BATCH_ELEMENTS // n_alphas)
+
+    ray_parts, i_parts, j_parts, k_parts, len_parts = [], [], [], [], []
+    for lo in range(0, n_rays, batch):
+        hi = min(lo + batch, n_rays)
+        origin = starts[lo:hi]
+        direction = ends[lo:hi] - origin
+        ray_length = np.sqrt((direction**2).sum(axis=1))
+
+        alphas = np.empty((hi - lo, n_alphas))
+        alphas[:, 0] = 0.0
+        alphas[:, 1] = 1.0
+        col = 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for axis in range(3):
+                block = alphas[:, col:col + len(planes[axis])]
+                np.subtract(planes[axis], origin[:, axis:axis + 1], out=block)
+                np.divide(block, direction[:, axis:axis + 1], out=block)
+                col += len(planes[axis])
+        np.nan_to_num(alphas, copy=False, nan=1.0, posinf=1.0, neginf=0.0)
+        np.clip(alphas, 0.0, 1.0, out=alphas)
+        alphas.sort(axis=1)
+
+        segment = np.diff(alphas, axis=1)
+        rows, cols = np.nonzero(segment > 0)
+        segment = segment[rows, cols]
+        mid = alphas[rows, cols] + 0.5 * segment
+        index = [np.floor((origin[rows, axis] + mid * direction[rows, axis] - grid_min[axis])
+                          / voxel_size).astype(np.intp) for axis in range(3)]
+
+        inside = np.ones(len(rows), dtype=bool)
+        for axis in range(3):
+            inside &= (index[axis] >= 0) & (index[axis] < shape[axis])
+        rows = rows[inside]
+        ray_parts.append(rows + lo)
+        i_parts.append(index[0][inside])
+        j_parts.append(index[1][inside])
+        k_parts.append(index[2][inside])
+        len_parts.append(segment[inside] * ray_length[rows])
+
+    count("rays_traced", n_rays)
+    count("pixels_touched", sum(len(part) for part in ray_parts))
+    if not ray_parts:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty, empty, empty, np.empty(0)
+    return (np.concatenate(ray_parts), np.concatenate(i_parts), np.concatenate(j_parts),
+            np.concatenate(k_parts), np.concatenate(len_parts))
+
+
+@instrument()
+def siddons_algorithm(start, end, grid_shape, pixel_size, backend=None):
+    """
+    Siddon's algorithm for computing intersection lengths of a ray through a 2D grid.
+
+    Args:
+        start (tuple): (x0, y0) coordinates of the ray source
+        end (tuple): (x1, y1) coordinates of the detector
+        grid_shape (tuple): (num_rows, num_cols)
+        pixel_size (float): physical size of each pixel
+        backend (str): Compute backend (see core.backends)
+
+    Returns:
+        tuple of np.ndarray: (i, j, length) where (i[k], j[k]) is a pixel index and
+        length[k] the exact intersection length of the ray with that pixel
+    """
+    _, i, j, length = trace_rays(start, end, grid_shape, pixel_size, backend)
+    return i, j, length
 
-    counts = Counter(intersected)
-    return [(i, j, c * L / N) for (i, j), c in counts.items()]
 
 if __name__ == "__main__":
     # Example usage
-    src = (10.0, 10.0)
-    det = (80.0, 80.0)
-    result = siddons_algorithm(src, det, grid_shape=(128, 128), pixel_size=1.0)
-    print(f"Ray intersects {len(result)} pixels")
-    for px in result[:5]:
+    src = (-70.0, -50.0)
+    det = (80.0, 60.0)
+    i, j, length = siddons_algorithm(src, det, grid_shape=(128, 128), pixel_size=1.0)
+    print(f"Ray intersects {len(i)} pixels, total length {length.sum():.3f}")
+    for px in zip(i[:5], j[:5], length[:5]):
         print(px)
-
@@ -0,0 +1,279 @@
+# core/parallel_beam.py
+"""
+Fast projectors and FBP for ParallelBeamGeometry scans.
+
+All rays of one parallel-beam angle share a slope, so instead of tracing each
+ray (core.interpolation) the projector steps along the axis the rays are most
+aligned with (Joseph's method): at every row of pixels the crossing point of
+all rays is found at once and the image is linearly interpolated there. The
+backprojectors share the same layout: parallel_beam_backproject is pixel-driven
+(for FBP) and ParallelBeamProjector.back is the exact adjoint of forward (for
+core.iterative).
+"""
+import numpy as np
+
+from core.filters import apply_filter, ramp_filter
+from core.instrumentation import count, instrument
+
+
+def _pixel_centres(n, pixel_size):
+    return (np.arange(n) - n / 2 + 0.5) * pixel_size
+
+
+def _joseph_passes(image_shape, angles):
+    """
+    Split angles into the two stepping directions.
+
+    Yields (angle indices, transpose, a, b): rays satisfy a * u + b * t = offset,
+    with t the stepped axis and u the interpolated one. Rays closer to the
+    y axis step along y (u = x); the rest step along x on the transposed image.
+    """
+    cos, sin = np.cos(angles), np.sin(angles)
+    along_y = np.abs(cos) >= np.abs(sin)
+    for mask, transpose, a, b in ((along_y, False, cos, sin), (~along_y, True, sin, cos)):
+        indices = np.nonzero(mask)[0]
+        if len(indices):
+            yield indices, transpose, a, b
+
+
+def _joseph_samples(a, b, offsets, n_interp, n_step, pixel_size):
+    """Flat indices into the padded [n_interp + 3, n_step] image and interpolation weights."""
+    # Continuous index into the padded axis (shifted by the one leading zero
+    # row) is separable: a per-detector term plus a per-step term.
+    steps = _pixel_centres(n_step, pixel_size)
+    along = offsets / pixel_size / a[:, np.newaxis]
+    across = (n_interp / 2 + 0.5) - (b / a)[:, np.newaxis] * steps / pixel_size
+    position = along[:, :, np.newaxis] + across[:, np.newaxis, :]
+    np.clip(position, 0, n_interp + 1, out=position)
+    row = position.astype(np.intp)
+    weight = position - row
+    row *= n_step
+    row += np.arange(n_step)
+    return row, weight
+
+
+def _padded(image, transpose):
+    """Image (transposed if asked) with one zero row before and two after the interpolated axis."""
+    image = image.T if transpose else image
+    padded = np.zeros((image.shape[0] + 3, image.shape[1]))
+    padded[1:-2] = image
+    return padded
+
+
+@instrument()
+def joseph_project(image, angles, offsets, pixel_size=1.0, batch_size=1, out=None):
+    """
+    Parallel-beam line integrals by Joseph's method.
+
+    Args:
+        image (np.ndarray): 2D image indexed [x, y] on the centred grid of core.interpolation
+        angles (np.ndarray): Projection angles (radians)
+        offsets (np.ndarray): Signed ray distances from the rotation axis
+        pixel_size (float): Physical size of each pixel
+        batch_size (int): Angles interpolated at once
+        out (np.ndarray): Optional [angles x detectors] output buffer
+
+    Returns:
+        np.ndarray: Sinogram [angles x detectors]
+    """
+    angles = np.asarray(angles, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.float64)
+    if out is None:
+        out = np.empty((len(angles), len(offsets)))
+    for indices, transpose, a, b in _joseph_passes(image.shape, angles):
+        padded = _padded(image, transpose)
+        n_interp, n_step = padded.shape[0] - 3, padded.shape[1]
+        flat = padded.reshape(-1)
+        for lo in range(0, len(indices), batch_size):
+            batch = indices[lo:lo + batch_size]
+            index, weight = _joseph_samples(a[batch], b[batch], offsets, n_interp, n_step, pixel_size)
+            values = flat[index]
+            values += weight * (flat[index + n_step] - values)
+            out[batch] = values.sum(axis=2) * (pixel_size / np.abs(a[batch]))[:, np.newaxis]
+    count("rays_traced", out.size)
+    return out
+
+
+@instrument()
+def joseph_adjoint(sinogram, angles, offsets, image_shape, pixel_size=1.0, batch_size=8):
+    """
+    Exact transpose of joseph_project (unnormalized backprojection A^T y).
+
+    Args:
+        sinogram (np.ndarray): [angles x detectors]
+        angles (np.ndarray): Projection angles (radians)
+        offsets (np.ndarray): Signed ray distances from the rotation axis
+        image_shape (Tuple[int, int]): Output image size (H, W)
+        pixel_size (float): Physical size of each pixel
+        batch_size (int): Angles scattered at once
+
+    Returns:
+        np.ndarray: 2D image
+    """
+    angles = np.asarray(angles, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.float64)
+    sinogram = np.asarray(sinogram, dtype=np.float64)
+    image = np.zeros(image_shape)
+    for indices, transpose, a, b in _joseph_passes(image_shape, angles):
+        n_interp, n_step = (image_shape[1], image_shape[0]) if transpose else image_shape
+        accumulator = np.zeros((n_interp + 3) * n_step)
+        for lo in range(0, len(indices), batch_size):
+            batch = indices[lo:lo + batch_size]
+            index, weight = _joseph_samples(a[batch], b[batch], offsets, n_interp, n_step, pixel_size)
+            scaled = sinogram[batch] * (pixel_size / np.abs(a[batch]))[:, np.newaxis]
+            contribution = np.broadcast_to(scaled[:, :, np.newaxis], index.shape)
+            accumulator += np.bincount(index.ravel(), weights=(contribution * (1 - weight)).ravel(),
+                                       minlength=accumulator.size)
+            accumulator += np.bincount((index + n_step).ravel(), weights=(contribution * weight).ravel(),
+                                       minlength=accumulator.size)
+        block = accumulator.reshape(n_interp + 3, n_step)[1:-2]
+        image += block.T if transpose else block
+    return image
+
+
+def parallel_beam_project(image, geometry, pixel_size=1.0, batch_size=1, out=None):
+    """
+    Sinogram of an image for a ParallelBeamGeometry scan.
+
+    Args:
+        image (np.ndarray): 2D image (phantom)
+        geometry (ParallelBeamGeometry): Parallel-beam geometry
+        pixel_size (float): Physical size of each pixel
+        batch_size (int): Angles interpolated at once
+        out (np.ndarray): Optional [angles x detectors] output buffer
+
+    Returns:
+        np.ndarray: 2D sinogram (angles x detectors)
+    """
+    return joseph_project(image, geometry.get_angles(), geometry.get_detector_offsets(), pixel_size,
+                          batch_size, out)
+
+
+def parallel_beam_filter(sinogram, geometry, filter_func=ramp_filter):
+    """
+    Ramp-filter sinogram rows for parallel-beam FBP.
+
+    Args:
+        sinogram (np.ndarray): Raw sinogram rows [angles x detectors] of line integrals
+        geometry (ParallelBeamGeometry): Parallel-beam geometry
+        filter_func (function): Reconstruction filter from core.filters
+
+    Returns:
+        np.ndarray: Filtered rows ready for parallel_beam_backproject
+    """
+    # apply_filter uses a 2|f| ramp in cycles/sample; the continuous ramp in
+    # cycles per unit length is that divided by 2 * detector_spacing.
+    filtered = apply_filter(sinogram, filter_func)
+    filtered /= 2 * geometry.detector_spacing
+    return filtered
+
+
+@instrument()
+def parallel_beam_backproject(filtered_sinogram, geometry, image_shape, pixel_size=1.0, batch_size=8, first_angle=0):
+    """
+    Pixel-driven parallel-beam backprojection of an already filtered sinogram.
+
+    Every pixel is projected onto the detector (offset x cos + y sin) and the
+    row is linearly interpolated there. Scans over 2*pi count each line twice,
+    so contributions are scaled by pi / angular_range.
+
+    Args:
+        filtered_sinogram (np.ndarray): Filtered sinogram [angles x detectors]
+        geometry (ParallelBeamGeometry): Parallel-beam geometry
+        image_shape (Tuple[int, int]): Output image size (H, W)
+        pixel_size (float): Physical size of each pixel
+        batch_size (int): Number of angles backprojected at once
+        first_angle (int): Index of the scan angle of the first row
+
+    Returns:
+        np.ndarray: 2D reconstructed image (this block's contribution)
+    """
+    nx, ny = image_shape
+    angles = geometry.get_angles()[first_angle:first_angle + len(filtered_sinogram)]
+    offsets = geometry.get_detector_offsets()
+    d_theta = geometry.angular_range / geometry.num_angles
+    x = _pixel_centres(nx, pixel_size)[:, np.newaxis]
+    y = _pixel_centres(ny, pixel_size)[np.newaxis, :]
+
+    n_det = filtered_sinogram.shape[1]
+    padded = np.zeros((len(angles), n_det + 3))
+    padded[:, 1:n_det + 1] = filtered_sinogram
+    flat = padded.reshape(-1)
+
+    reconstruction = np.zeros(image_shape)
+    for lo in range(0, len(angles), batch_size):
+        theta = angles[lo:lo + batch_size, np.newaxis, np.newaxis]
+        position = (x * np.cos(theta) + y * np.sin(theta) - offsets[0]) / geometry.detector_spacing
+        np.clip(position, -1, n_det, out=position)
+        floor = np.floor(position)
+        weight = position - floor
+        index = floor.astype(np.intp) + 1
+        index += ((lo + np.arange(len(theta))) * padded.shape[1])[:, np.newaxis, np.newaxis]
+        values = flat[index]
+        values += weight * (flat[index + 1] - values)
+        reconstruction += values.sum(axis=0)
+
+    return reconstruction * d_theta * (np.pi / geometry.angular_range)
+
+
+def parallel_beam_fbp(sinogram, geometry, image_shape, pixel_size=1.0, filter_func=ramp_filter, batch_size=8):
+    """
+    Parallel-beam filtered backprojection.
+
+    Args:
+        sinogram (np.ndarray): Raw sinogram [angles x detectors] of line integrals
+        geometry (ParallelBeamGeometry): Parallel-beam geometry
+        image_shape (Tuple[int, int]): Output image size (H, W)
+        pixel_size (float): Physical size of each pixel
+        filter_func (function): Reconstruction filter from core.filters
+        batch_size (int): Number of angles backprojected at once
+
+    Returns:
+        np.ndarray: 2D reconstructed image
+    """
+    filtered = parallel_beam_filter(sinogram, geometry, filter_func)
+    return parallel_beam_backproject(filtered, geometry, image_shape, pixel_size, batch_size)
+
+
+class ParallelBeamProjector:
+    """
+    Matched Joseph projector pair for a ParallelBeamGeometry, with the same
+    interface as core.system_matrix.SystemMatrixProjector (forward, back,
+    subset, sinogram_shape, image_shape) but no matrix to build or store.
+    """
+
+    def __init__(self, geometry, image_shape, pixel_size=1.0, angle_indices=None):
+        self.geometry = geometry
+        self.image_shape = tuple(image_shape)
+        self.pixel_size = pixel_size
+        angles = geometry.get_angles()
+        self.angles = angles if angle_indices is None else angles[np.asarray(angle_indices)]
+        self.offsets = geometry.get_detector_offsets()
+        self.sinogram_shape = (len(self.angles), len(self.offsets))
+
+    def forward(self, image):
+        """Project an image to a sinogram."""
+        return joseph_project(np.reshape(image, self.image_shape), self.angles, self.offsets, self.pixel_size)
+
+    def back(self, sinogram):
+        """Backproject a sinogram without normalization (the exact adjoint of forward)."""
+        return joseph_adjoint(np.reshape(sinogram, self.sinogram_shape), self.angles, self.offsets,
+                              self.image_shape, self.pixel_size)
+
+    def subset(self, angle_indices):
+        """Projector for the given angles only; its sinogram rows follow angle_indices."""
+        projector = ParallelBeamProjector(self.geometry, self.image_shape, self.pixel_size)
+        projector.angles = self.angles[np.asarray(angle_indices)]
+        projector.sinogram_shape = (len(projector.angles), len(self.offsets))
+        return projector
+
+
+if __name__ == "__main__":
+    from core.geometry import ParallelBeamGeometry
+    from core.phantoms import generate_shepp_logan
+
+    phantom = generate_shepp_logan(256)
+    geometry = ParallelBeamGeometry(num_angles=180, num_detectors=367, detector_spacing=1.0)
+    sinogram = parallel_beam_project(phantom, geometry)
+    reconstruction = parallel_beam_fbp(sinogram, geometry, phantom.shape)
+    print("Parallel-beam FBP RMSE:", np.sqrt(np.mean((reconstruction - phantom)**2)))
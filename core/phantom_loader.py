@@ -75,8 +75,8 @@ def load_nifti_phantom(filepath, size=(256, 256)):
     if nib is None:
         raise ImportError("nibabel is not installed. Please install it to use NIfTI support.")
 
-    img = nib.load(filepath).get_fdata()
-    slice_2d = img[:, :, img.shape[2] // 2]  # take middle slice
+    proxy = nib.load(filepath).dataobj
+    slice_2d = np.asarray(proxy[:, :, proxy.shape[2] // 2], dtype=np.float64)  # decode the middle slice only
     img_resized = resize(slice_2d, size, mode='reflect', anti_aliasing=True)
     img_normalized = (img_resized - img_resized.min()) / (img_resized.max() - img_resized.min() + 1e-8)
     return img_normalized
@@ -91,6 +91,8 @@ if __name__ == "__main__":
     # NIfTI example (uncomment to use)
     # phantom = load_nifti_phantom("../phantoms/sample.nii.gz")
 
+    # Whole DICOM series or NIfTI volumes: see core.volume_loader
+
     import matplotlib.pyplot as plt
     plt.imshow(phantom, cmap='gray')
     plt.title("Loaded Phantom")
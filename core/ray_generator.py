@@ -1,11 +1,61 @@
 # core/ray_generator.py
 """
 Generate ray paths between source and detector positions for each angle.
+
+Rays come in two forms. The array form from generate_ray_arrays holds a whole
+scan in two contiguous arrays, sources [angles x 2] and detectors
+[angles x detectors x 2]; the nested-list form from generate_ray_pairs holds one
+(source, detector) tuple per ray. Every downstream stage accepts either and
+normalizes with as_ray_arrays.
 """
 import numpy as np
-from core.geometry import CTGeometry
+from core.geometry import CTGeometry, ParallelBeamGeometry
+from core.instrumentation import count, instrument
+
 
+@instrument()
+def generate_ray_arrays(geometry: CTGeometry, dtype=np.float64):
+    """
+    Generate all source and detector positions of a scan in one broadcast.
+
+    Args:
+        geometry (CTGeometry or ParallelBeamGeometry): CT geometry configuration
+        dtype (np.dtype): float64 (default) or float32 to halve memory
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: sources [angles x 2] and detectors [angles x detectors x 2];
+        for parallel beams every ray has its own start, so sources are [angles x detectors x 2]
+    """
+    if isinstance(geometry, ParallelBeamGeometry):
+        return _parallel_ray_arrays(geometry, dtype)
+    angles = geometry.get_angles()
+    det_angles = angles[:, np.newaxis] + np.pi - geometry.get_fan_angles()[np.newaxis, :]
 
+    source_x = geometry.source_to_center * np.cos(angles)
+    source_y = geometry.source_to_center * np.sin(angles)
+    sources = np.stack((source_x, source_y), axis=-1)
+
+    det_x = source_x[:, np.newaxis] + geometry.source_to_detector * np.cos(det_angles)
+    det_y = source_y[:, np.newaxis] + geometry.source_to_detector * np.sin(det_angles)
+    detectors = np.stack((det_x, det_y), axis=-1)
+    count("rays_generated", det_x.size)
+
+    return sources.astype(dtype, copy=False), detectors.astype(dtype, copy=False)
+
+
+def _parallel_ray_arrays(geometry, dtype):
+    angles = geometry.get_angles()[:, np.newaxis, np.newaxis]
+    offsets = geometry.get_detector_offsets()[np.newaxis, :, np.newaxis]
+    normal = np.concatenate((np.cos(angles), np.sin(angles)), axis=-1)
+    direction = np.concatenate((-np.sin(angles), np.cos(angles)), axis=-1)
+    centre = offsets * normal
+    sources = centre - geometry.radius * direction
+    detectors = centre + geometry.radius * direction
+    count("rays_generated", geometry.num_angles * geometry.num_detectors)
+    return sources.astype(dtype, copy=False), detectors.astype(dtype, copy=False)
+
+
+@instrument()
 def generate_ray_pairs(geometry: CTGeometry):
     """
     Generate all source-detector ray pairs for each projection angle.
@@ -17,16 +67,67 @@ def generate_ray_pairs(geometry: CTGeometry):
         List[List[Tuple[source: np.ndarray, detector: np.ndarray]]]
         A list of rays per angle, each ray as (source, detector) tuple
     """
-    all_rays = []
+    sources, detectors = generate_ray_arrays(geometry)
+    return [list(zip(np.broadcast_to(source, angle_detectors.shape), angle_detectors))
+            for source, angle_detectors in zip(sources, detectors)]
+
+
+def as_ray_arrays(rays):
+    """
+    Normalize either ray form to (sources, detectors) arrays.
+
+    Args:
+        rays: (sources, detectors) from generate_ray_arrays, or the nested
+            per-angle list from generate_ray_pairs
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: sources [angles x 2] (or [angles x detectors x 2])
+        and detectors [angles x detectors x 2]
+    """
+    if isinstance(rays, tuple) and len(rays) == 2 and isinstance(rays[1], np.ndarray):
+        return rays
+
+    n_angles = len(rays)
+    detectors = np.array([[detector for _, detector in angle_rays] for angle_rays in rays])
+    sources = np.array([[source for source, _ in angle_rays] for angle_rays in rays])
+    detectors = detectors.reshape(n_angles, -1, 2)
+    sources = sources.reshape(n_angles, -1, 2)
+    if np.all(sources == sources[:, :1]):
+        sources = np.ascontiguousarray(sources[:, 0])
+    return sources, detectors
+
+
+def generate_cone_rays(geometry, angle_indices=None, dtype=np.float64):
+    """
+    Generate source and detector-cell positions of a cone-beam scan.
+
+    A full 512-row scan does not fit comfortably in memory at once, so the
+    projectors ask for a few angles at a time through angle_indices.
+
+    Args:
+        geometry (ConeBeamGeometry): Cone-beam geometry
+        angle_indices (array-like): Scan angles to generate (default: all)
+        dtype (np.dtype): float64 (default) or float32
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: sources [angles x 3] and detector cells
+        [angles x rows x columns x 3]
+    """
     angles = geometry.get_angles()
+    if angle_indices is not None:
+        angles = angles[np.asarray(angle_indices)]
+    sources = np.stack([geometry.get_source_position(a) for a in angles]) if len(angles) else np.empty((0, 3))
+    detectors = np.empty((len(angles), geometry.num_rows, geometry.num_detectors, 3), dtype=dtype)
+    for k, angle in enumerate(angles):
+        detectors[k] = geometry.get_detector_positions(angle)
+    count("rays_generated", detectors.size // 3)
+    return sources.astype(dtype, copy=False), detectors
 
-    for angle in angles:
-        source = geometry.get_source_position(angle)
-        detectors = geometry.get_detector_positions(angle)
-        rays = [(source, det) for det in detectors]
-        all_rays.append(rays)
 
-    return all_rays
+def rays_at_angle(sources, detectors, angle_idx):
+    """Return broadcast (starts, ends) [detectors x 2] arrays for one angle of a ray array pair."""
+    ends = detectors[angle_idx]
+    return np.broadcast_to(sources[angle_idx], ends.shape), ends
 
 
 if __name__ == "__main__":
@@ -37,8 +138,7 @@ if __name__ == "__main__":
         source_to_center=500,
         source_to_detector=1000
     )
-    ray_pairs = generate_ray_pairs(geo)
-    print(f"Generated rays for {len(ray_pairs)} angles")
-    print(f"Rays per angle: {len(ray_pairs[0])}")
-    print("Example ray (source → detector):", ray_pairs[0][0])
-
+    sources, detectors = generate_ray_arrays(geo)
+    print(f"Generated rays for {sources.shape[0]} angles")
+    print(f"Rays per angle: {detectors.shape[1]}")
+    print("Example ray (source → detector):", sources[0], detectors[0, 0])
@@ -0,0 +1,211 @@
+# core/system_matrix.py
+"""
+Sparse system matrix (A) holding every ray/pixel intersection length of a scan.
+
+Row r = angle_idx * num_detectors + det_idx is one ray, column c = i * ny + j one
+pixel, so forward projection is ``A @ phantom.ravel()`` and backprojection is
+``A.T @ sinogram.ravel()``. Matrices are cached on disk keyed by a hash of the
+geometry so repeated runs and worker processes can memory-map them.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from core.instrumentation import instrument
+from core.interpolation import trace_rays
+from core.ray_generator import as_ray_arrays, generate_ray_arrays, rays_at_angle
+
+# Bump when the on-disk layout or the tracing convention changes.
+CACHE_FORMAT_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "openrbyr", "system_matrix")
+
+
+def get_cache_dir(cache_dir=None):
+    """Resolve the system matrix cache directory (argument, $OPENRBYR_CACHE_DIR, or ~/.cache)."""
+    return cache_dir or os.environ.get("OPENRBYR_CACHE_DIR") or DEFAULT_CACHE_DIR
+
+
+def geometry_key(geometry, grid_shape, pixel_size=1.0):
+    """
+    Hash the parameters that determine the system matrix.
+
+    Args:
+        geometry: Scanner geometry (e.g. CTGeometry); all its attributes are hashed
+        grid_shape (Tuple[int, int]): Shape of the image grid
+        pixel_size (float): Physical size of each pixel
+
+    Returns:
+        str: Hex digest identifying the matrix
+    """
+    params = {
+        "version": CACHE_FORMAT_VERSION,
+        "geometry": type(geometry).__name__,
+        "attributes": {k: repr(v) for k, v in sorted(vars(geometry).items())},
+        "grid_shape": [int(n) for n in grid_shape],
+        "pixel_size": repr(float(pixel_size)),
+    }
+    blob = json.dumps(params, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+@instrument()
+def build_system_matrix(rays, grid_shape, pixel_size=1.0, backend=None):
+    """
+    Assemble the CSR system matrix by tracing every ray once.
+
+    Args:
+        rays: (sources, detectors) arrays from generate_ray_arrays, or the
+            per-angle ray lists from generate_ray_pairs
+        grid_shape (Tuple[int, int]): Shape of the image grid
+        pixel_size (float): Physical size of each pixel
+        backend (str): Tracing backend (see core.backends)
+
+    Returns:
+        scipy.sparse.csr_matrix: [angles * detectors x H * W] intersection lengths
+    """
+    sources, detectors = as_ray_arrays(rays)
+    n_angles, n_detectors = detectors.shape[:2]
+    n_pixels = int(np.prod(grid_shape))
+    n_rays = n_angles * n_detectors
+
+    row_counts = np.zeros(n_rays, dtype=np.int64)
+    indices, data = [], []
+    for angle_idx in range(n_angles):
+        starts, ends = rays_at_angle(sources, detectors, angle_idx)
+        ray_idx, i, j, length = trace_rays(starts, ends, grid_shape, pixel_size, backend)
+        offset = angle_idx * n_detectors
+        row_counts[offset:offset + n_detectors] = np.bincount(ray_idx, minlength=n_detectors)
+        indices.append(np.ravel_multi_index((i, j), grid_shape))
+        data.append(length)
+
+    indptr = np.zeros(n_rays + 1, dtype=np.int64)
+    np.cumsum(row_counts, out=indptr[1:])
+    index_dtype = np.int32 if max(n_pixels, indptr[-1]) < np.iinfo(np.int32).max else np.int64
+
+    data = np.concatenate(data) if data else np.empty(0)
+    indices = np.concatenate(indices).astype(index_dtype) if indices else np.empty(0, dtype=index_dtype)
+    matrix = csr_matrix((data, indices, indptr.astype(index_dtype)), shape=(n_rays, n_pixels))
+    matrix.sort_indices()
+    return matrix
+
+
+def save_system_matrix(matrix, path):
+    """
+    Write a CSR matrix as a directory of .npy files that can be memory-mapped.
+
+    The directory is written next to its final location and renamed into
+    place, so concurrent writers never expose a half-written matrix.
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    try:
+        np.save(os.path.join(tmp, "data.npy"), matrix.data)
+        np.save(os.path.join(tmp, "indices.npy"), matrix.indices)
+        np.save(os.path.join(tmp, "indptr.npy"), matrix.indptr)
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump({"shape": list(matrix.shape), "version": CACHE_FORMAT_VERSION}, f)
+        os.rename(tmp, path)
+    except OSError:
+        # Another process won the race; its copy is equivalent.
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.isdir(path):
+            raise
+
+
+@instrument()
+def load_system_matrix(path, mmap=True):
+    """
+    Load a matrix written by save_system_matrix.
+
+    Args:
+        path (str): Matrix directory
+        mmap (bool): Memory-map the arrays read-only instead of reading them into RAM
+
+    Returns:
+        scipy.sparse.csr_matrix: The system matrix
+    """
+    mode = "r" if mmap else None
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    data = np.load(os.path.join(path, "data.npy"), mmap_mode=mode)
+    indices = np.load(os.path.join(path, "indices.npy"), mmap_mode=mode)
+    indptr = np.load(os.path.join(path, "indptr.npy"), mmap_mode=mode)
+    return csr_matrix((data, indices, indptr), shape=tuple(meta["shape"]), copy=False)
+
+
+def get_system_matrix(geometry, grid_shape, pixel_size=1.0, cache_dir=None, mmap=True):
+    """
+    Return the system matrix for a geometry, building and caching it on first use.
+
+    Args:
+        geometry (CTGeometry): CT geometry configuration
+        grid_shape (Tuple[int, int]): Shape of the image grid
+        pixel_size (float): Physical size of each pixel
+        cache_dir (str): Cache directory; pass False to disable the disk cache
+        mmap (bool): Memory-map cached matrices instead of reading them into RAM
+
+    Returns:
+        scipy.sparse.csr_matrix: [angles * detectors x H * W] system matrix
+    """
+    if cache_dir is False:
+        return build_system_matrix(generate_ray_arrays(geometry), grid_shape, pixel_size)
+
+    path = os.path.join(get_cache_dir(cache_dir), geometry_key(geometry, grid_shape, pixel_size))
+    if not os.path.isdir(path):
+        matrix = build_system_matrix(generate_ray_arrays(geometry), grid_shape, pixel_size)
+        save_system_matrix(matrix, path)
+    return load_system_matrix(path, mmap=mmap)
+
+
+class SystemMatrixProjector:
+    """
+    Reusable forward/back projector pair backed by a system matrix.
+
+    forward maps an image to a sinogram [angles x detectors] and back is its
+    exact adjoint. subset(angle_indices) returns a projector restricted to
+    those angles, which is what ordered-subsets reconstruction iterates over.
+    """
+
+    def __init__(self, matrix, sinogram_shape, image_shape):
+        self.matrix = matrix
+        self.sinogram_shape = tuple(sinogram_shape)
+        self.image_shape = tuple(image_shape)
+
+    @classmethod
+    def from_geometry(cls, geometry, image_shape, pixel_size=1.0, cache_dir=None):
+        """Build (or load from the cache) the projector for a CTGeometry scan."""
+        matrix = get_system_matrix(geometry, image_shape, pixel_size, cache_dir=cache_dir)
+        return cls(matrix, (geometry.num_angles, geometry.num_detectors), image_shape)
+
+    def forward(self, image):
+        """Project an image to a sinogram (A @ x)."""
+        return (self.matrix @ np.ravel(image)).reshape(self.sinogram_shape)
+
+    def back(self, sinogram):
+        """Backproject a sinogram without normalization (A.T @ y)."""
+        return (self.matrix.T @ np.ravel(sinogram)).reshape(self.image_shape)
+
+    def subset(self, angle_indices):
+        """Projector for the given angles only; its sinogram rows follow angle_indices."""
+        angle_indices = np.asarray(angle_indices)
+        n_detectors = self.sinogram_shape[1]
+        rows = (angle_indices[:, np.newaxis] * n_detectors + np.arange(n_detectors)).ravel()
+        return SystemMatrixProjector(self.matrix[rows], (len(angle_indices), n_detectors), self.image_shape)
+
+
+if __name__ == "__main__":
+    from core.geometry import CTGeometry
+
+    geometry = CTGeometry(num_angles=90, num_detectors=128, detector_spacing=1.0,
+                          source_to_center=500, source_to_detector=1000)
+    A = get_system_matrix(geometry, (128, 128), pixel_size=1.0)
+    print(f"System matrix {A.shape}, {A.nnz} non-zeros")
+    sinogram = (A @ np.ones(128 * 128)).reshape(geometry.num_angles, geometry.num_detectors)
+    print("Sinogram shape:", sinogram.shape)
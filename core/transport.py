@@ -0,0 +1,337 @@
+# core/transport.py
+"""
+Vectorized photon-transport Monte Carlo through a 2D attenuation phantom.
+
+Photons leave the source of a fan-beam CTGeometry towards the arc detector and
+are tracked through the phantom grid with Woodcock (delta) tracking: flights are
+sampled against the maximum attenuation and accepted as real interactions with
+probability mu(x) / mu_max. Real interactions are split into photoelectric
+absorption, Compton scattering (Klein-Nishina) and Rayleigh scattering
+(Thomson) by fixed fractions. Scattering stays in the image plane and the
+attenuation is energy independent.
+
+All photon state lives in NumPy arrays. Photons are simulated in batches of
+at most batch_size, and batch b always draws from the b-th child of
+SeedSequence(seed), so a run is reproducible however it is split: the
+multi-process runner parallel_transport_photons hands whole batches to its
+workers and produces the same tallies for any worker count.
+"""
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+ELECTRON_REST_ENERGY_KEV = 511.0
+
+
+def empty_tally(geometry):
+    """Zeroed tally for a geometry; tallies of batches are combined with merge_tallies."""
+    shape = (geometry.num_angles, geometry.num_detectors)
+    return {
+        "num_photons": 0,
+        "primary": np.zeros(shape, dtype=np.int64),
+        "scatter": np.zeros(shape, dtype=np.int64),
+        "absorbed": 0,
+        "compton_events": 0,
+        "rayleigh_events": 0,
+        "undetected": 0,
+    }
+
+
+def merge_tallies(total, tally):
+    """Add tally into total in place and return total."""
+    for key, value in tally.items():
+        total[key] = total[key] + value
+    return total
+
+
+def batch_seeds(num_photons, batch_size, seed=None):
+    """
+    Split a run into batches and give each its own independent seed.
+
+    Returns:
+        List[Tuple[int, np.random.SeedSequence]]: (photons in batch, seed) per batch
+    """
+    num_batches = max(1, -(-num_photons // batch_size))
+    seeds = np.random.SeedSequence(seed).spawn(num_batches)
+    sizes = [min(batch_size, num_photons - b * batch_size) for b in range(num_batches)]
+    return list(zip(sizes, seeds))
+
+
+def _sample_klein_nishina(rng, energy_kev):
+    """Sample Compton scattering cosines and the scattered-to-incident energy ratio."""
+    cos_theta = np.empty_like(energy_kev)
+    ratio = np.empty_like(energy_kev)
+    pending = np.arange(len(energy_kev))
+    while pending.size:
+        k = energy_kev[pending] / ELECTRON_REST_ENERGY_KEV
+        mu = rng.uniform(-1.0, 1.0, pending.size)
+        eps = 1.0 / (1.0 + k * (1.0 - mu))
+        # The Klein-Nishina shape eps^2 (eps + 1/eps - sin^2) peaks at 2 for mu = 1.
+        accept = 2.0 * rng.random(pending.size) < eps**2 * (eps + 1.0 / eps - (1.0 - mu**2))
+        cos_theta[pending[accept]] = mu[accept]
+        ratio[pending[accept]] = eps[accept]
+        pending = pending[~accept]
+    return cos_theta, ratio
+
+
+def _sample_thomson(rng, n):
+    """Sample Rayleigh scattering cosines from the (1 + mu^2) Thomson shape."""
+    cos_theta = np.empty(n)
+    pending = np.arange(n)
+    while pending.size:
+        mu = rng.uniform(-1.0, 1.0, pending.size)
+        accept = 2.0 * rng.random(pending.size) < 1.0 + mu**2
+        cos_theta[pending[accept]] = mu[accept]
+        pending = pending[~accept]
+    return cos_theta
+
+
+def _box_entry(px, py, ux, uy, half_x, half_y):
+    """Slab test against the grid box: returns (hits, distance to entry)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tx1, tx2 = (-half_x - px) / ux, (half_x - px) / ux
+        ty1, ty2 = (-half_y - py) / uy, (half_y - py) / uy
+    t_near = np.maximum(np.fmin(tx1, tx2), np.fmin(ty1, ty2))
+    t_far = np.minimum(np.fmax(tx1, tx2), np.fmax(ty1, ty2))
+    hits = (t_far > np.maximum(t_near, 0)) & np.isfinite(t_far)
+    return hits, np.maximum(t_near, 0)
+
+
+def simulate_batch(phantom, geometry, num_photons, rng, pixel_size=1.0, energy_kev=60.0,
+                   photoelectric_fraction=0.3, rayleigh_fraction=0.05):
+    """
+    Transport one batch of photons and tally where they are detected.
+
+    Args:
+        phantom (np.ndarray): 2D linear attenuation map (per unit length), indexed [x, y]
+        geometry (CTGeometry): Fan-beam geometry
+        num_photons (int): Photons in this batch
+        rng (np.random.Generator): Random stream for this batch
+        pixel_size (float): Physical size of each pixel
+        energy_kev (float): Source photon energy
+        photoelectric_fraction (float): Share of interactions that absorb the photon
+        rayleigh_fraction (float): Share of interactions that are Rayleigh scatters
+
+    Returns:
+        dict: Tally (see empty_tally)
+    """
+    tally = empty_tally(geometry)
+    tally["num_photons"] = num_photons
+    nx, ny = phantom.shape
+    half_x, half_y = 0.5 * nx * pixel_size, 0.5 * ny * pixel_size
+    mu_max = float(np.max(phantom))
+
+    angles = geometry.get_angles()
+    fan_angles = geometry.get_fan_angles()
+    d_gamma = (fan_angles[-1] - fan_angles[0]) / max(len(fan_angles) - 1, 1)
+
+    # Emit uniformly over angles and over the fan covered by the detector cells.
+    angle_idx = rng.integers(0, len(angles), num_photons)
+    gamma = rng.uniform(fan_angles[0] - 0.5 * d_gamma, fan_angles[-1] + 0.5 * d_gamma, num_photons)
+    beta = angles[angle_idx]
+    src_x = geometry.source_to_center * np.cos(beta)
+    src_y = geometry.source_to_center * np.sin(beta)
+    heading = beta + np.pi - gamma
+    px, py = src_x.copy(), src_y.copy()
+    ux, uy = np.cos(heading), np.sin(heading)
+    energy = np.full(num_photons, float(energy_kev))
+    scattered = np.zeros(num_photons, dtype=bool)
+
+    # Photons that miss the grid fly straight to the detector; the rest start at the grid edge.
+    hits, t_entry = _box_entry(px, py, ux, uy, half_x, half_y)
+    px += np.where(hits, t_entry, 0.0) * ux
+    py += np.where(hits, t_entry, 0.0) * uy
+    escaped = [np.flatnonzero(~hits)]
+    active = np.flatnonzero(hits)
+    if mu_max <= 0:
+        escaped.append(active)
+        active = active[:0]
+
+    while active.size:
+        step = rng.exponential(1.0 / mu_max, active.size)
+        px[active] += step * ux[active]
+        py[active] += step * uy[active]
+
+        x, y = px[active], py[active]
+        inside = (np.abs(x) < half_x) & (np.abs(y) < half_y)
+        # Leaving photons go back to their last in-grid position; the rest of
+        # their straight flight to the detector is resolved after the loop.
+        leaving = active[~inside]
+        px[leaving] -= step[~inside] * ux[leaving]
+        py[leaving] -= step[~inside] * uy[leaving]
+        escaped.append(leaving)
+        active = active[inside]
+
+        i = np.minimum(((px[active] + half_x) / pixel_size).astype(np.intp), nx - 1)
+        j = np.minimum(((py[active] + half_y) / pixel_size).astype(np.intp), ny - 1)
+        real = rng.random(active.size) * mu_max < phantom[i, j]
+        colliding = active[real]
+        if not colliding.size:
+            continue
+
+        kind = rng.random(colliding.size)
+        absorbed = kind < photoelectric_fraction
+        rayleigh = (kind >= photoelectric_fraction) & (kind < photoelectric_fraction + rayleigh_fraction)
+        compton = ~absorbed & ~rayleigh
+        tally["absorbed"] += int(absorbed.sum())
+        tally["rayleigh_events"] += int(rayleigh.sum())
+        tally["compton_events"] += int(compton.sum())
+
+        cos_theta = np.empty(colliding.size)
+        cos_theta[rayleigh] = _sample_thomson(rng, int(rayleigh.sum()))
+        idx = colliding[compton]
+        cos_theta[compton], ratio = _sample_klein_nishina(rng, energy[idx])
+        energy[idx] *= ratio
+
+        turning = colliding[~absorbed]
+        theta = np.arccos(cos_theta[~absorbed]) * rng.choice((-1.0, 1.0), turning.size)
+        cos_t, sin_t = np.cos(theta), np.sin(theta)
+        ux[turning], uy[turning] = (ux[turning] * cos_t - uy[turning] * sin_t,
+                                    ux[turning] * sin_t + uy[turning] * cos_t)
+        scattered[turning] = True
+
+        keep = np.ones(active.size, dtype=bool)
+        keep[np.flatnonzero(real)[absorbed]] = False
+        active = active[keep]
+
+    # Fly escaped photons to the detector arc (radius source_to_detector around their source).
+    out = np.concatenate(escaped)
+    rx, ry = px[out] - src_x[out], py[out] - src_y[out]
+    b = rx * ux[out] + ry * uy[out]
+    c = rx**2 + ry**2 - geometry.source_to_detector**2
+    t = -b + np.sqrt(np.maximum(b**2 - c, 0.0))
+    hit_x, hit_y = rx + t * ux[out], ry + t * uy[out]
+    det_gamma = np.angle(np.exp(1j * (beta[out] + np.pi - np.arctan2(hit_y, hit_x))))
+    det_idx = np.rint((det_gamma - fan_angles[0]) / d_gamma).astype(np.intp)
+
+    detected = (c < 0) & (det_idx >= 0) & (det_idx < len(fan_angles))
+    tally["undetected"] = int(out.size - detected.sum())
+    out, det_idx = out[detected], det_idx[detected]
+    flat = angle_idx[out] * len(fan_angles) + det_idx
+    size = tally["primary"].size
+    tally["primary"] += np.bincount(flat[~scattered[out]], minlength=size).reshape(tally["primary"].shape)
+    tally["scatter"] += np.bincount(flat[scattered[out]], minlength=size).reshape(tally["scatter"].shape)
+    return tally
+
+
+def transport_photons(phantom, geometry, num_photons, pixel_size=1.0, energy_kev=60.0,
+                      batch_size=1_000_000, seed=None, photoelectric_fraction=0.3,
+                      rayleigh_fraction=0.05, progress=None):
+    """
+    Run a full Monte Carlo transport simulation in bounded-memory batches.
+
+    Args:
+        phantom (np.ndarray): 2D linear attenuation map (per unit length)
+        geometry (CTGeometry): Fan-beam geometry
+        num_photons (int): Total number of photons
+        pixel_size (float): Physical size of each pixel
+        energy_kev (float): Source photon energy
+        batch_size (int): Maximum photons held in memory at once
+        seed (int): Root seed; None draws fresh OS entropy
+        photoelectric_fraction (float): Share of interactions that absorb the photon
+        rayleigh_fraction (float): Share of interactions that are Rayleigh scatters
+        progress (callable): Optional progress(fraction) called after each batch
+
+    Returns:
+        dict: Merged tally with primary/scatter detector sinograms [angles x detectors]
+        and event counts
+    """
+    phantom = np.asarray(phantom, dtype=np.float64)
+    total = empty_tally(geometry)
+    for size, batch_seed in batch_seeds(num_photons, batch_size, seed):
+        tally = simulate_batch(phantom, geometry, size, np.random.default_rng(batch_seed),
+                               pixel_size=pixel_size, energy_kev=energy_kev,
+                               photoelectric_fraction=photoelectric_fraction,
+                               rayleigh_fraction=rayleigh_fraction)
+        merge_tallies(total, tally)
+        if progress is not None:
+            progress(total["num_photons"] / max(num_photons, 1))
+    return total
+
+
+# Phantom and geometry installed in each pool worker by _init_worker.
+_worker_args = None
+
+
+def _init_worker(phantom, geometry, options):
+    global _worker_args
+    _worker_args = (phantom, geometry, options)
+
+
+def _run_batch(size, batch_seed):
+    phantom, geometry, options = _worker_args
+    start = time.perf_counter()
+    tally = simulate_batch(phantom, geometry, size, np.random.default_rng(batch_seed), **options)
+    return os.getpid(), time.perf_counter() - start, tally
+
+
+def parallel_transport_photons(phantom, geometry, num_photons, workers=None, pixel_size=1.0,
+                               energy_kev=60.0, batch_size=1_000_000, seed=None,
+                               photoelectric_fraction=0.3, rayleigh_fraction=0.05):
+    """
+    Run transport_photons on a process pool and merge the tallies as batches finish.
+
+    Batches and their RNG streams are derived from the root seed exactly as in
+    transport_photons, and tallies are integer counts, so the merged result is
+    identical to the single-process run for any number of workers. At most two
+    batches per worker are in flight, so only their tallies are held at once.
+
+    Args:
+        workers (int): Number of processes (defaults to os.cpu_count())
+        Other arguments are as for transport_photons.
+
+    Returns:
+        Tuple[dict, List[dict]]: The merged tally, and per-worker statistics
+        (worker pid, batches, particles, busy seconds, particles_per_sec)
+    """
+    workers = workers or os.cpu_count() or 1
+    options = dict(pixel_size=pixel_size, energy_kev=energy_kev,
+                   photoelectric_fraction=photoelectric_fraction,
+                   rayleigh_fraction=rayleigh_fraction)
+    total = empty_tally(geometry)
+    stats = {}
+
+    batches = iter(batch_seeds(num_photons, batch_size, seed))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(np.asarray(phantom, dtype=np.float64), geometry, options)) as pool:
+        pending = set()
+        while True:
+            for size, batch_seed in batches:
+                pending.add(pool.submit(_run_batch, size, batch_seed))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pid, seconds, tally = future.result()
+                merge_tallies(total, tally)
+                worker = stats.setdefault(pid, {"worker": pid, "batches": 0, "particles": 0, "seconds": 0.0})
+                worker["batches"] += 1
+                worker["particles"] += tally["num_photons"]
+                worker["seconds"] += seconds
+
+    for worker in stats.values():
+        worker["particles_per_sec"] = worker["particles"] / worker["seconds"] if worker["seconds"] > 0 else 0.0
+    return total, sorted(stats.values(), key=lambda w: w["worker"])
+
+
+if __name__ == "__main__":
+    from core.geometry import CTGeometry
+    from core.phantoms import generate_breast_tissue
+
+    phantom = generate_breast_tissue(64) * 0.05  # attenuation per mm
+    geometry = CTGeometry(num_angles=36, num_detectors=64, detector_spacing=4.0,
+                          source_to_center=500, source_to_detector=1000)
+    result = transport_photons(phantom, geometry, 200_000, batch_size=50_000, seed=0)
+    print("Primary counts:", result["primary"].sum(), "Scatter counts:", result["scatter"].sum())
+    print("Absorbed:", result["absorbed"], "Compton:", result["compton_events"],
+          "Rayleigh:", result["rayleigh_events"])
+
+    parallel, workers = parallel_transport_photons(phantom, geometry, 200_000, workers=4,
+                                                   batch_size=50_000, seed=0)
+    print("Parallel matches serial:", all(np.array_equal(result[k], parallel[k]) for k in result))
+    for worker in workers:
+        print(f"  worker {worker['worker']}: {worker['particles_per_sec']:.0f} particles/s")
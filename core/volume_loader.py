@@ -0,0 +1,281 @@
+# core/volume_loader.py
+"""
+Lazy loading of volumetric phantoms from DICOM series and NIfTI files.
+
+open_dicom_series and open_nifti return a LazyVolume: nothing but headers is
+read up front, and indexing a range of slices decodes only those slices,
+then resizes and normalizes them like core.phantom_loader does for single
+images. DICOM files are decoded on a thread pool; NIfTI slices come from
+nibabel's array proxy, which reads just the requested part of the file.
+
+With a cache_dir, processed slices are also written to a memory-mapped .npy
+file keyed by the source files and the processing options, so later
+accesses (and later runs) read them back instead of decoding again.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from skimage.transform import resize
+
+try:
+    import pydicom
+    try:
+        from pydicom.pixels import apply_modality_lut
+    except ImportError:  # pydicom < 3.0
+        from pydicom.pixel_data_handlers.util import apply_modality_lut
+except ImportError:
+    pydicom = None
+
+try:
+    import nibabel as nib
+except ImportError:
+    nib = None
+
+# Bump when the processing of cached slices changes.
+CACHE_FORMAT_VERSION = 1
+
+
+def _process_slice(raw, size, window):
+    """Resize one raw slice and scale it to [0, 1] (per slice unless a window is given)."""
+    image = np.asarray(raw, dtype=np.float32)
+    if size is not None and image.shape != tuple(size):
+        image = resize(image, size, mode='reflect', anti_aliasing=True)
+    if window is None:
+        lo, hi = image.min(), image.max()
+    else:
+        lo, hi = window
+        image = np.clip(image, lo, hi)
+    return ((image - lo) / (hi - lo + 1e-8)).astype(np.float32)
+
+
+class LazyVolume:
+    """
+    Volume of 2D slices decoded, resized and normalized on demand.
+
+    ``volume[k]`` is one processed slice, ``volume[lo:hi]`` a [n, H, W] block.
+    Slices are float32 in [0, 1]: each slice is min/max normalized like the
+    single-image loaders, or clipped to and scaled by a fixed window (e.g. a
+    Hounsfield range) so intensities are comparable across slices.
+    """
+
+    def __init__(self, read_slices, num_slices, slice_shape, source_id, size=None, window=None,
+                 cache_dir=None, workers=None):
+        """
+        Args:
+            read_slices (callable): read_slices(indices) -> list of raw 2D arrays
+            num_slices (int): Number of slices
+            slice_shape (Tuple[int, int]): Raw slice shape
+            source_id (str): Identity of the source data, part of the cache key
+            size (Tuple[int, int]): Output slice size (default: raw size)
+            window (Tuple[float, float]): Fixed intensity range mapped to [0, 1]
+            cache_dir (str): Directory for the memory-mapped cache of processed slices
+            workers (int): Threads used to process slices (default: CPU count)
+        """
+        self._read_slices = read_slices
+        self.num_slices = num_slices
+        self.slice_shape = tuple(slice_shape)
+        self.size = tuple(size) if size is not None else self.slice_shape
+        self.window = tuple(window) if window is not None else None
+        self.workers = workers or os.cpu_count() or 1
+        self._cache = None
+        self._cached = None
+        if cache_dir is not None:
+            self._open_cache(cache_dir, source_id)
+
+    @property
+    def shape(self):
+        return (self.num_slices,) + self.size
+
+    def __len__(self):
+        return self.num_slices
+
+    def __repr__(self):
+        return f"LazyVolume(shape={self.shape})"
+
+    def _open_cache(self, cache_dir, source_id):
+        params = {"version": CACHE_FORMAT_VERSION, "source": source_id, "size": list(self.size),
+                  "window": self.window}
+        key = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+        os.makedirs(cache_dir, exist_ok=True)
+        data_path = os.path.join(cache_dir, f"{key}.npy")
+        done_path = os.path.join(cache_dir, f"{key}.done.npy")
+        if os.path.exists(data_path) and os.path.exists(done_path):
+            self._cache = np.load(data_path, mmap_mode="r+")
+            self._cached = np.load(done_path, mmap_mode="r+")
+        else:
+            self._cache = np.lib.format.open_memmap(data_path, mode="w+", dtype=np.float32, shape=self.shape)
+            self._cached = np.lib.format.open_memmap(done_path, mode="w+", dtype=bool, shape=(self.num_slices,))
+
+    def _load(self, indices):
+        """Process the given slices, from the cache where possible."""
+        out = np.empty((len(indices),) + self.size, dtype=np.float32)
+        missing = np.arange(len(indices))
+        if self._cache is not None:
+            hit = self._cached[indices]
+            out[hit] = self._cache[indices[hit]]
+            missing = missing[~hit]
+        if len(missing):
+            raw = self._read_slices(indices[missing])
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                processed = list(pool.map(_process_slice, raw, [self.size] * len(raw), [self.window] * len(raw)))
+            out[missing] = processed
+            if self._cache is not None:
+                # Slice data first, then the flags, so a flagged slice is always complete.
+                self._cache[indices[missing]] = out[missing]
+                self._cache.flush()
+                self._cached[indices[missing]] = True
+                self._cached.flush()
+        return out
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            # Slices are processed whole; the in-plane part of the key applies afterwards.
+            block = self[key[0]]
+            return block[(slice(None),) + key[1:]] if block.ndim == 3 else block[key[1:]]
+        if isinstance(key, (int, np.integer)):
+            index = int(key) + self.num_slices if key < 0 else int(key)
+            if not 0 <= index < self.num_slices:
+                raise IndexError(f"Slice {key} out of range for {self.num_slices} slices")
+            return self._load(np.array([index]))[0]
+        if isinstance(key, slice):
+            return self._load(np.arange(*key.indices(self.num_slices)))
+        indices = np.asarray(key, dtype=np.intp)
+        if indices.ndim != 1:
+            raise IndexError(f"Slice indices must be an integer, a slice or a 1D sequence, got shape {indices.shape}")
+        bad = (indices < -self.num_slices) | (indices >= self.num_slices)
+        if bad.any():
+            raise IndexError(f"Slice {indices[bad][0]} out of range for {self.num_slices} slices")
+        return self._load(np.where(indices < 0, indices + self.num_slices, indices))
+
+    def middle_slice(self):
+        """The centre slice, as core.phantom_loader.load_nifti_phantom takes it."""
+        return self[self.num_slices // 2]
+
+    def iter_slabs(self, slab_size=32):
+        """Yield (first_slice, block) over the whole volume."""
+        for lo in range(0, self.num_slices, slab_size):
+            yield lo, self[lo:lo + slab_size]
+
+
+def _file_id(path):
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def _read_dicom_header(path):
+    try:
+        return pydicom.dcmread(path, stop_before_pixels=True)
+    except pydicom.errors.InvalidDicomError:
+        return None
+
+
+def _slice_position(header):
+    """Position of a slice along its normal (falls back to the instance number)."""
+    if "ImagePositionPatient" in header and "ImageOrientationPatient" in header:
+        orientation = np.array(header.ImageOrientationPatient, dtype=np.float64)
+        normal = np.cross(orientation[:3], orientation[3:])
+        return float(np.dot(normal, np.array(header.ImagePositionPatient, dtype=np.float64)))
+    return float(getattr(header, "InstanceNumber", 0) or 0)
+
+
+def _read_dicom_pixels(path):
+    ds = pydicom.dcmread(path)
+    return apply_modality_lut(ds.pixel_array, ds).astype(np.float32)
+
+
+def open_dicom_series(path, size=None, window=None, cache_dir=None, workers=None):
+    """
+    Open a DICOM series as a lazy volume with slices sorted by position.
+
+    Args:
+        path (str or List[str]): Directory of the series, or its files
+        size (Tuple[int, int]): Output slice size (default: raw size)
+        window (Tuple[float, float]): Fixed intensity range (after the modality
+            LUT, i.e. Hounsfield units for CT) mapped to [0, 1]
+        cache_dir (str): Directory for the memory-mapped cache of processed slices
+        workers (int): Threads reading headers and decoding slices (default: CPU count)
+
+    Returns:
+        LazyVolume: The series
+    """
+    if pydicom is None:
+        raise ImportError("pydicom is not installed. Please install it to use DICOM support.")
+    if isinstance(path, (str, os.PathLike)):
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"DICOM series directory not found: {path}")
+        files = sorted(os.path.join(path, name) for name in os.listdir(path)
+                       if os.path.isfile(os.path.join(path, name)))
+    else:
+        files = list(path)
+    workers = workers or os.cpu_count() or 1
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        headers = list(pool.map(_read_dicom_header, files))
+    series = sorted((_slice_position(header), name, header)
+                    for name, header in zip(files, headers) if header is not None)
+    if not series:
+        raise ValueError(f"No DICOM files found in {path}")
+    files = [name for _, name, _ in series]
+    slice_shape = (int(series[0][2].Rows), int(series[0][2].Columns))
+
+    def read_slices(indices):
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_read_dicom_pixels, [files[i] for i in indices]))
+
+    source_id = json.dumps([_file_id(name) for name in files])
+    return LazyVolume(read_slices, len(files), slice_shape, source_id, size, window, cache_dir, workers)
+
+
+def open_nifti(path, axis=2, size=None, window=None, cache_dir=None, workers=None):
+    """
+    Open a NIfTI volume lazily; slices are taken along axis.
+
+    Args:
+        path (str): NIfTI file (.nii or .nii.gz)
+        axis (int): Slice axis of the stored array (2 gives [:, :, k] slices)
+        size (Tuple[int, int]): Output slice size (default: raw size)
+        window (Tuple[float, float]): Fixed intensity range mapped to [0, 1]
+        cache_dir (str): Directory for the memory-mapped cache of processed slices
+        workers (int): Threads processing slices (default: CPU count)
+
+    Returns:
+        LazyVolume: The volume
+    """
+    if nib is None:
+        raise ImportError("nibabel is not installed. Please install it to use NIfTI support.")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"NIfTI file not found: {path}")
+    proxy = nib.load(path).dataobj
+    if len(proxy.shape) < 3:
+        raise ValueError(f"Expected a 3D NIfTI volume, got shape {proxy.shape}")
+    slice_shape = tuple(n for a, n in enumerate(proxy.shape[:3]) if a != axis)
+
+    def read_slices(indices):
+        # One proxy read per run of consecutive slices, so scattered indices
+        # do not decode everything between them.
+        wanted = np.unique(indices)
+        runs = np.split(wanted, np.flatnonzero(np.diff(wanted) != 1) + 1)
+        slices = {}
+        for run in runs:
+            lo, hi = int(run[0]), int(run[-1]) + 1
+            selection = [slice(None)] * 3 + [0] * (len(proxy.shape) - 3)
+            selection[axis] = slice(lo, hi)
+            block = np.moveaxis(np.asarray(proxy[tuple(selection)], dtype=np.float32), axis, 0)
+            slices.update(zip(range(lo, hi), block))
+        return [slices[int(i)] for i in indices]
+
+    return LazyVolume(read_slices, proxy.shape[axis], slice_shape, json.dumps([_file_id(path), axis]),
+                      size, window, cache_dir, workers)
+
+
+if __name__ == "__main__":
+    import sys
+
+    volume = open_nifti(sys.argv[1], size=(256, 256)) if len(sys.argv) > 1 else None
+    if volume is None:
+        print("Usage: python -m core.volume_loader volume.nii.gz")
+    else:
+        print(volume, "middle slice range:", volume.middle_slice().min(), volume.middle_slice().max())
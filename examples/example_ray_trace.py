@@ -5,8 +5,7 @@ Visualize ray paths through a phantom using Siddon's algorithm.
 import matplotlib.pyplot as plt
 from core.geometry import CTGeometry
 from core.phantoms import generate_shepp_logan
-from core.ray_generator import generate_ray_pairs
-from core.interpolation import siddons_algorithm
+from core.ray_generator import generate_ray_arrays
 import numpy as np
 
 # Setup
@@ -18,17 +17,20 @@ geo = CTGeometry(
     source_to_center=500,
     source_to_detector=1000
 )
-rays = generate_ray_pairs(geo)[0]  # One angle's rays only
+sources, detectors = generate_ray_arrays(geo)
+src, dets = sources[0], detectors[0]  # One angle's rays only
 
-# Plot phantom
-plt.imshow(phantom, cmap="gray", extent=[0, phantom.shape[1], phantom.shape[0], 0])
+# Plot phantom (the grid is centred on the rotation axis; rows run along x)
+half = phantom.shape[0] / 2
+plt.imshow(phantom.T, cmap="gray", origin="lower", extent=[-half, half, -half, half])
 plt.title("Ray Paths over Shepp-Logan Phantom")
 
-# Overlay rays
-for src, det in rays:
-    plt.plot([src[0], det[0]], [src[1], det[1]], color='red', alpha=0.4, linewidth=0.5)
-    plt.scatter(*src, color='blue', s=5)  # Source point
-    plt.scatter(*det, color='green', s=5)  # Detector point
+# Overlay rays: one line segment per column of the (2, num_detectors) arrays
+xs = np.stack((np.full(len(dets), src[0]), dets[:, 0]))
+ys = np.stack((np.full(len(dets), src[1]), dets[:, 1]))
+plt.plot(xs, ys, color='red', alpha=0.4, linewidth=0.5)
+plt.scatter(*src, color='blue', s=5)  # Source point
+plt.scatter(dets[:, 0], dets[:, 1], color='green', s=5)  # Detector points
 
 plt.axis('off')
 plt.tight_layout()
@@ -2,9 +2,11 @@
 OpenRBYR-Core: A Ray-by-Ray CT Simulation Toolkit
 """
 
+__version__ = "0.1.0"
+
 from .ray_simulation import RaySimulation
 from .monte_carlo import MonteCarloSimulation
-from .reconstruction import MARTReconstruction
+from .reconstruction import MARTReconstruction, IterativeReconstruction
 from .utils import save_array_to_file, load_array_from_file
 
-__all__ = ["RaySimulation", "MonteCarloSimulation", "MARTReconstruction", "save_array_to_file", "load_array_from_file"]
+__all__ = ["RaySimulation", "MonteCarloSimulation", "MARTReconstruction", "IterativeReconstruction", "save_array_to_file", "load_array_from_file"]
@@ -0,0 +1,134 @@
+"""
+Binary encodings of NumPy arrays for the HTTP API.
+
+Arrays travel as one of:
+    application/octet-stream  raw bytes, with X-Array-Dtype / X-Array-Shape headers
+    application/x-npy         a .npy file
+    application/x-npz         a compressed .npz archive holding one array
+    application/json          nested lists (the fallback)
+
+negotiate picks the response encoding from an Accept header.
+"""
+import io
+import zipfile
+
+import numpy as np
+
+OCTET_STREAM = "application/octet-stream"
+NPY = "application/x-npy"
+NPZ = "application/x-npz"
+JSON = "application/json"
+
+BINARY_TYPES = (OCTET_STREAM, NPY, NPZ)
+MEDIA_TYPES = BINARY_TYPES + (JSON,)
+
+DTYPE_HEADER = "X-Array-Dtype"
+SHAPE_HEADER = "X-Array-Shape"
+
+def media_type(content_type):
+    """Bare media type of a Content-Type header value ("" if missing)."""
+    return (content_type or "").split(";")[0].strip().lower()
+
+def negotiate(accept, default=JSON):
+    """
+    Choose the response media type for an Accept header.
+
+    Args:
+        accept (str): Accept header value; missing or "*/*" selects default
+        default (str): Media type used for wildcards
+
+    Returns:
+        str: One of MEDIA_TYPES, or None if nothing acceptable is supported
+    """
+    if not accept:
+        return default
+    choices = []
+    for position, item in enumerate(accept.split(",")):
+        fields = item.split(";")
+        name = fields[0].strip().lower()
+        quality = 1.0
+        for param in fields[1:]:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            choices.append((-quality, position, name))
+    for _, _, name in sorted(choices):
+        if name in MEDIA_TYPES:
+            return name
+        if name in ("*/*", "application/*"):
+            return default
+    return None
+
+def encode_array(array, media_type):
+    """
+    Serialize an array.
+
+    Args:
+        array (np.ndarray): Array to encode
+        media_type (str): One of BINARY_TYPES
+
+    Returns:
+        Tuple[bytes, dict]: Body and extra response headers
+    """
+    array = np.asarray(array)
+    if media_type == OCTET_STREAM:
+        array = np.ascontiguousarray(array)
+        headers = {DTYPE_HEADER: array.dtype.str, SHAPE_HEADER: ",".join(map(str, array.shape))}
+        return array.tobytes(), headers
+    buffer = io.BytesIO()
+    if media_type == NPY:
+        np.save(buffer, array, allow_pickle=False)
+    elif media_type == NPZ:
+        np.savez_compressed(buffer, array=array)
+    else:
+        raise ValueError(f"Cannot encode an array as '{media_type}'")
+    return buffer.getvalue(), {}
+
+def decode_array(body, media_type, dtype=None, shape=None):
+    """
+    Deserialize an array sent as one of BINARY_TYPES.
+
+    Args:
+        body (bytes): Request body
+        media_type (str): Its media type
+        dtype (str): X-Array-Dtype header (octet-stream only, e.g. "<f4" or "float32")
+        shape (str): X-Array-Shape header (octet-stream only, e.g. "360,512");
+            omitted means a flat array
+
+    Returns:
+        np.ndarray: The decoded array (read-only for octet-stream bodies)
+    """
+    if media_type == OCTET_STREAM:
+        if not dtype:
+            raise ValueError(f"{DTYPE_HEADER} header is required for {OCTET_STREAM} bodies")
+        try:
+            dtype = np.dtype(dtype)
+        except TypeError:
+            raise ValueError(f"Invalid {DTYPE_HEADER} '{dtype}'")
+        if dtype.hasobject or dtype.itemsize == 0:
+            raise ValueError(f"Unsupported {DTYPE_HEADER} '{dtype}'")
+        if len(body) % dtype.itemsize:
+            raise ValueError(f"Body of {len(body)} bytes is not a whole number of {dtype} items")
+        array = np.frombuffer(body, dtype=dtype)
+        if shape:
+            try:
+                dims = tuple(int(n) for n in shape.split(","))
+                array = array.reshape(dims)
+            except ValueError:
+                raise ValueError(f"{SHAPE_HEADER} '{shape}' does not match {array.size} items")
+        return array
+    try:
+        if media_type == NPY:
+            return np.load(io.BytesIO(body), allow_pickle=False)
+        if media_type == NPZ:
+            with np.load(io.BytesIO(body), allow_pickle=False) as archive:
+                if len(archive.files) != 1:
+                    raise ValueError(f"Expected one array in the npz archive, found {len(archive.files)}")
+                return archive[archive.files[0]]
+    except (OSError, EOFError, zipfile.BadZipFile) as e:
+        raise ValueError(f"Malformed {media_type} body: {e}")
+    raise ValueError(f"Unsupported media type '{media_type}'")
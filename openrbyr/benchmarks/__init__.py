@@ -0,0 +1,8 @@
+"""
+Benchmark suite for the OpenRBYR core stages (see openrbyr.benchmarks.__main__ for the CLI).
+"""
+
+from .cases import CASES, Size, make_geometry
+from .harness import PRESETS, compare, measure, run_suite, size_matrix
+
+__all__ = ["CASES", "Size", "make_geometry", "PRESETS", "compare", "measure", "run_suite", "size_matrix"]
@@ -0,0 +1,72 @@
+"""
+Command line entry point: ``python -m openrbyr.benchmarks`` or ``openrbyr-bench``.
+
+Examples:
+    python -m openrbyr.benchmarks --preset smoke --output bench.json
+    python -m openrbyr.benchmarks --cases forward_project backproject --images 256 512 \
+        --baseline baseline.json --threshold 0.1
+
+The exit status is 1 when a comparison against --baseline finds a regression.
+"""
+import argparse
+import os
+import sys
+
+from openrbyr.benchmarks.cases import CASES
+from core.backends import set_backend
+from openrbyr.benchmarks.harness import PRESETS, compare, load_results, run_suite, save_results, size_matrix
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="openrbyr-bench", description="Benchmark the OpenRBYR core stages.")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES),
+                        help="Stages to benchmark (default: all)")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="production",
+                        help="Size matrix; --images/--angles/--detectors override its axes")
+    parser.add_argument("--images", nargs="+", type=int, help="Image sizes (pixels per side)")
+    parser.add_argument("--angles", nargs="+", type=int, help="Numbers of projection angles")
+    parser.add_argument("--detectors", nargs="+", type=int, help="Numbers of detector elements")
+    parser.add_argument("--backend", choices=["numpy", "numba", "auto"],
+                        help="Ray-tracing backend (core.backends); defaults to $OPENRBYR_BACKEND or numpy")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per measurement")
+    parser.add_argument("--no-isolate", action="store_true",
+                        help="Run in this process (faster, but peak RSS becomes cumulative)")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this stored results file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown flagged as a regression (default 0.10)")
+    parser.add_argument("--memory-threshold", type=float, default=0.25,
+                        help="Relative peak RSS growth flagged as a regression (default 0.25)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.backend:
+        # Set in the environment too, so spawned measurement processes inherit it.
+        os.environ["OPENRBYR_BACKEND"] = args.backend
+        set_backend(args.backend)
+    preset = PRESETS[args.preset]
+    sizes = size_matrix(args.images or preset["images"], args.angles or preset["angles"],
+                        args.detectors or preset["detectors"])
+    results = run_suite(args.cases, sizes, repeat=args.repeat, isolate=not args.no_isolate)
+    if args.output:
+        save_results(results, args.output)
+        print(f"Results saved to {args.output}")
+
+    if not args.baseline:
+        return 0
+    report = compare(results, load_results(args.baseline), args.threshold, args.memory_threshold)
+    print(f"\nAgainst {args.baseline}:")
+    for entry in report:
+        print(f"{entry['case']:<22} {entry['image']:>4}px {entry['angles']:>4}a {entry['detectors']:>5}d  "
+              f"time x{entry['time_ratio']:.2f}  memory x{entry['memory_ratio']:.2f}  {entry['status']}")
+    regressions = [entry for entry in report if entry["status"] == "regression"]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond the thresholds")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Benchmark cases for the core stages.
+
+Each case is a function ``setup(size)`` returning ``(run, work)``: ``run`` is
+the zero-argument callable that gets timed and ``work`` the number of units
+(rays or pixels) one call processes. Setup (phantoms, rays, system matrices)
+is never timed.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from core.analytic_phantoms import analytic_sinogram, shepp_logan_shapes
+from core.backprojection import backproject, fan_beam_fbp
+from core.filters import apply_filter, ramp_filter
+from core.geometry import CTGeometry, ParallelBeamGeometry
+from core.interpolation import siddons_algorithm
+from core.parallel_beam import parallel_beam_project
+from core.phantoms import generate_shepp_logan
+from core.projection import forward_project, forward_project_batch
+from core.ray_generator import generate_ray_arrays
+from core.system_matrix import build_system_matrix
+from openrbyr.reconstruction import MARTReconstruction
+
+Size = namedtuple("Size", ["image", "angles", "detectors"])
+
+# Per-ray Siddon calls are far slower than the vectorized stages, so that
+# case traces only the rays of the first few angles.
+SIDDON_ANGLES = 4
+MART_ITERATIONS = 2
+BATCH_PHANTOMS = 16
+
+
+def make_geometry(size):
+    """
+    Fan-beam geometry whose fan just covers a size.image^2 grid of unit pixels.
+
+    The source sits two image widths from the centre and the detector four.
+    """
+    source_to_center = 2.0 * size.image
+    source_to_detector = 4.0 * size.image
+    half_fan = np.arcsin(size.image / np.sqrt(2) / source_to_center)
+    span = 2 * source_to_detector * np.tan(half_fan)
+    return CTGeometry(size.angles, size.detectors, span / size.detectors,
+                      source_to_center, source_to_detector)
+
+
+def _scan(size):
+    geometry = make_geometry(size)
+    phantom = generate_shepp_logan(size.image)
+    rays = generate_ray_arrays(geometry)
+    return geometry, phantom, rays
+
+
+def siddon_case(size):
+    geometry, phantom, (sources, detectors) = _scan(size)
+    grid_shape = phantom.shape
+    angles = min(SIDDON_ANGLES, size.angles)
+
+    def run():
+        for a in range(angles):
+            for d in range(size.detectors):
+                siddons_algorithm(sources[a], detectors[a, d], grid_shape, 1.0)
+
+    return run, angles * size.detectors
+
+
+def forward_project_case(size):
+    geometry, phantom, rays = _scan(size)
+    return (lambda: forward_project(phantom, rays, phantom.shape)), size.angles * size.detectors
+
+
+def forward_project_batch_case(size):
+    geometry, phantom, rays = _scan(size)
+    stack = np.stack([phantom] * BATCH_PHANTOMS)
+    return (lambda: forward_project_batch(stack, rays, phantom.shape)), BATCH_PHANTOMS * size.angles * size.detectors
+
+
+def analytic_sinogram_case(size):
+    geometry = make_geometry(size)
+    shapes = shepp_logan_shapes(size.image)
+    return (lambda: analytic_sinogram(shapes, geometry)), size.angles * size.detectors
+
+
+def parallel_beam_case(size):
+    geometry = ParallelBeamGeometry(size.angles, size.detectors, np.sqrt(2) * size.image / size.detectors)
+    phantom = generate_shepp_logan(size.image)
+    return (lambda: parallel_beam_project(phantom, geometry)), size.angles * size.detectors
+
+
+def backproject_case(size):
+    geometry, phantom, rays = _scan(size)
+    sinogram = np.ones((size.angles, size.detectors))
+    return (lambda: backproject(sinogram, rays, phantom.shape)), size.angles * size.detectors
+
+
+def system_matrix_case(size):
+    geometry, phantom, rays = _scan(size)
+    return (lambda: build_system_matrix(rays, phantom.shape)), size.angles * size.detectors
+
+
+def apply_filter_case(size):
+    sinogram = np.random.default_rng(0).random((size.angles, size.detectors))
+    return (lambda: apply_filter(sinogram, ramp_filter)), size.angles * size.detectors
+
+
+def fbp_case(size):
+    geometry, phantom, rays = _scan(size)
+    sinogram = np.random.default_rng(0).random((size.angles, size.detectors))
+    return (lambda: fan_beam_fbp(sinogram, geometry, phantom.shape)), size.image ** 2
+
+
+def mart_case(size):
+    geometry, phantom, rays = _scan(size)
+    recon = MARTReconstruction(MART_ITERATIONS, geometry, phantom.shape, cache_dir=False)
+    recon.get_projector()
+    sinogram = recon.projector.forward(phantom)
+    return (lambda: recon.reconstruct(sinogram)), MART_ITERATIONS * size.image ** 2
+
+
+Case = namedtuple("Case", ["setup", "unit"])
+
+CASES = {
+    "siddons_algorithm": Case(siddon_case, "rays/s"),
+    "forward_project": Case(forward_project_case, "rays/s"),
+    "forward_project_batch": Case(forward_project_batch_case, "rays/s"),
+    "analytic_sinogram": Case(analytic_sinogram_case, "rays/s"),
+    "parallel_beam_project": Case(parallel_beam_case, "rays/s"),
+    "backproject": Case(backproject_case, "rays/s"),
+    "system_matrix": Case(system_matrix_case, "rays/s"),
+    "apply_filter": Case(apply_filter_case, "rays/s"),
+    "fan_beam_fbp": Case(fbp_case, "pixels/s"),
+    "mart": Case(mart_case, "pixels/s"),
+}
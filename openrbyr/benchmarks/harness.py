@@ -0,0 +1,176 @@
+"""
+Run benchmark cases over a size matrix, record the results as JSON and
+compare them against a stored baseline.
+
+By default every (case, size) runs in a fresh spawned process, so its peak
+RSS is its own and not the high-water mark of everything that ran before.
+"""
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+
+import numpy as np
+
+from openrbyr.benchmarks.cases import CASES, Size
+
+PRESETS = {
+    "production": dict(images=(128, 256, 512), angles=(90, 180, 360), detectors=(128, 256, 512, 1024)),
+    "smoke": dict(images=(32,), angles=(18,), detectors=(32,)),
+}
+
+
+def size_matrix(images, angles, detectors):
+    return [Size(*combo) for combo in itertools.product(images, angles, detectors)]
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(case_name, size, repeat=3):
+    """
+    Time one case at one size in the current process.
+
+    Args:
+        case_name (str): Key of openrbyr.benchmarks.cases.CASES
+        size (Size): Image, angle and detector counts
+        repeat (int): Timed runs after one untimed warm-up
+
+    Returns:
+        dict: Timings (best, median, all runs), peak RSS and throughput
+    """
+    case = CASES[case_name]
+    run, work = case.setup(size)
+    run()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {
+        "case": case_name,
+        "image": size.image,
+        "angles": size.angles,
+        "detectors": size.detectors,
+        "wall_time": best,
+        "median_time": float(np.median(times)),
+        "times": times,
+        "peak_rss_mb": _peak_rss_mb(),
+        "throughput": work / best if best > 0 else float("inf"),
+        "unit": case.unit,
+    }
+
+
+def _measure_in_child(args):
+    return measure(*args)
+
+
+def run_suite(cases, sizes, repeat=3, isolate=True, log=print):
+    """
+    Measure every case at every size.
+
+    Args:
+        cases (List[str]): Case names
+        sizes (List[Size]): Sizes to run
+        repeat (int): Timed runs per measurement
+        isolate (bool): Run each measurement in a fresh spawned process
+        log (callable): Progress output; None for silence
+
+    Returns:
+        dict: {"metadata": ..., "results": [...]}
+    """
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for name, size in itertools.product(cases, sizes):
+        if isolate:
+            with context.Pool(1) as pool:
+                result = pool.apply(_measure_in_child, ((name, size, repeat),))
+        else:
+            result = measure(name, size, repeat)
+        results.append(result)
+        if log:
+            log(f"{name:<22} {size.image:>4}px {size.angles:>4}a {size.detectors:>5}d  "
+                f"{result['wall_time']:9.4f} s  {result['throughput']:12.4g} {result['unit']}  "
+                f"{result['peak_rss_mb']:8.1f} MB")
+    return {"metadata": environment(repeat, isolate), "results": results}
+
+
+def environment(repeat=3, isolate=True):
+    from openrbyr import __version__
+    from core.backends import resolve_backend
+    import scipy
+    return {
+        "openrbyr": __version__,
+        "backend": resolve_backend(os.environ.get("OPENRBYR_BACKEND")),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "isolated": isolate,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def _key(result):
+    return (result["case"], result["image"], result["angles"], result["detectors"])
+
+
+def compare(current, baseline, threshold=0.10, memory_threshold=0.25):
+    """
+    Compare a run against a baseline, matching measurements by case and size.
+
+    Args:
+        current (dict): Output of run_suite
+        baseline (dict): A stored run_suite output
+        threshold (float): Relative slowdown of the best wall time flagged as a regression
+        memory_threshold (float): Relative growth of peak RSS flagged as a regression
+
+    Returns:
+        List[dict]: One entry per shared measurement with time and memory ratios
+        (current / baseline) and a "status" of "regression", "improvement" or "ok"
+    """
+    reference = {_key(r): r for r in baseline["results"]}
+    report = []
+    for result in current["results"]:
+        base = reference.get(_key(result))
+        if base is None:
+            continue
+        time_ratio = result["wall_time"] / base["wall_time"] if base["wall_time"] > 0 else 1.0
+        memory_ratio = result["peak_rss_mb"] / base["peak_rss_mb"] if base["peak_rss_mb"] > 0 else 1.0
+        if time_ratio > 1 + threshold or memory_ratio > 1 + memory_threshold:
+            status = "regression"
+        elif time_ratio < 1 / (1 + threshold):
+            status = "improvement"
+        else:
+            status = "ok"
+        report.append({
+            "case": result["case"],
+            "image": result["image"],
+            "angles": result["angles"],
+            "detectors": result["detectors"],
+            "time_ratio": time_ratio,
+            "memory_ratio": memory_ratio,
+            "status": status,
+        })
+    return report
+
+
+def save_results(results, path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
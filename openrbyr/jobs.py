@@ -0,0 +1,197 @@
+"""
+In-process job queue running long simulations on a process pool.
+
+Jobs are submitted with JobManager.submit and tracked by id through the
+queued -> running -> done / failed / cancelled states. The number of queued
+plus running jobs (including cancelled ones still running) is bounded;
+submitting beyond it raises JobQueueFull so callers can apply backpressure.
+Code running inside a job reports progress with report_progress(fraction).
+"""
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+# Set in pool workers: the channel back to the manager and the job being run.
+_progress_queue = None
+_current_job = None
+
+class JobQueueFull(RuntimeError):
+    """Raised by JobManager.submit when max_pending jobs are already queued or running."""
+
+def report_progress(fraction):
+    """Report the current job's progress in [0, 1]; a no-op outside a job."""
+    if _progress_queue is not None and _current_job is not None:
+        _progress_queue.put((_current_job, "progress", min(max(float(fraction), 0.0), 1.0)))
+
+def _init_worker(queue):
+    global _progress_queue
+    _progress_queue = queue
+
+def _execute(job_id, func, args, kwargs):
+    global _current_job
+    _current_job = job_id
+    _progress_queue.put((job_id, "started", time.time()))
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _current_job = None
+
+class Job:
+    def __init__(self, job_id, name):
+        self.id = job_id
+        self.name = name
+        self.status = QUEUED
+        self.progress = 0.0
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.error = None
+        self.result = None
+        self.future = None
+
+    def describe(self):
+        return {
+            "job_id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "progress": self.progress,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "error": self.error,
+        }
+
+class JobManager:
+    """
+    Bounded job queue on a ProcessPoolExecutor.
+
+    Queued jobs are cancelled outright. A running job cannot be interrupted
+    inside its worker process; cancelling it marks it cancelled and its
+    result is discarded when it completes. Until then it still counts
+    toward max_pending.
+    """
+
+    def __init__(self, max_workers=None, max_pending=16, max_finished=256):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._queue = None
+        self._listener = None
+
+    def _start(self):
+        context = multiprocessing.get_context()
+        self._queue = context.Queue()
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context,
+                                             initializer=_init_worker, initargs=(self._queue,))
+        self._listener = threading.Thread(target=self._listen, daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        while True:
+            message = self._queue.get()
+            if message is None:
+                return
+            job_id, kind, value = message
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job.status in FINISHED_STATES:
+                    continue
+                if kind == "started":
+                    job.status = RUNNING
+                    job.started = value
+                elif kind == "progress":
+                    job.progress = value
+
+    def _finish(self, job, future):
+        with self._lock:
+            if job.finished is None:  # a cancelled job keeps the time it was cancelled
+                job.finished = time.time()
+            if job.status != CANCELLED:
+                try:
+                    job.result = future.result()
+                    job.status = DONE
+                    job.progress = 1.0
+                except CancelledError:
+                    job.status = CANCELLED
+                except Exception as e:  # the job's own failure, reported through its status
+                    job.status = FAILED
+                    job.error = f"{type(e).__name__}: {e}"
+            self._evict()
+
+    @staticmethod
+    def _is_pending(job):
+        # A job cancelled while running still occupies its worker until it returns.
+        return job.status in (QUEUED, RUNNING) or (job.future is not None and not job.future.done())
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job.status in FINISHED_STATES and not self._is_pending(job)]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def pending_count(self):
+        with self._lock:
+            return sum(self._is_pending(job) for job in self._jobs.values())
+
+    def submit(self, func, *args, name=None, **kwargs):
+        """
+        Queue func(*args, **kwargs) on the pool and return the new job id.
+
+        func and its arguments must be picklable. Raises JobQueueFull when
+        max_pending jobs are already queued or running.
+        """
+        if self._executor is None:
+            self._start()
+        with self._lock:
+            if sum(self._is_pending(job) for job in self._jobs.values()) >= self.max_pending:
+                raise JobQueueFull(f"{self.max_pending} jobs already pending")
+            job = Job(uuid.uuid4().hex, name or getattr(func, "__name__", "job"))
+            # The future is set before the job becomes visible, so cancel always finds it.
+            job.future = self._executor.submit(_execute, job.id, func, args, kwargs)
+            self._jobs[job.id] = job
+        # Outside the lock: a future that is already done runs the callback right here.
+        job.future.add_done_callback(lambda future: self._finish(job, future))
+        return job.id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id):
+        """Status dict of a job, or None if the id is unknown."""
+        job = self.get(job_id)
+        return job.describe() if job is not None else None
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns False if it is unknown or already finished."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return False
+            job.status = CANCELLED
+            job.finished = time.time()
+            future = job.future
+        if future is not None:
+            future.cancel()
+        return True
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._queue.put(None)
+            self._listener.join(timeout=5)
+            self._executor = None
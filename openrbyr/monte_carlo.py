@@ -1,17 +1,67 @@
 import numpy as np
 
+from core.geometry import CTGeometry
+from core.transport import parallel_transport_photons, transport_photons
+
+# Linear attenuation of water at ~60 keV, per mm.
+WATER_MU_PER_MM = 0.0206
+
 class MonteCarloSimulation:
-    def __init__(self, num_particles=10000, detector_distance=50):
+    """
+    Photon-transport Monte Carlo through a phantom (see core.transport).
+
+    Without an explicit phantom and geometry, a water cylinder is scanned by a
+    fan-beam geometry whose source-to-detector distance is detector_distance.
+    With workers > 1 the batches run on a process pool; results for a fixed
+    seed do not depend on the worker count.
+    """
+
+    def __init__(self, num_particles=10000, detector_distance=50, phantom=None, geometry=None,
+                 pixel_size=None, energy_kev=60.0, batch_size=1_000_000, seed=None, workers=None):
         self.num_particles = num_particles
         self.detector_distance = detector_distance
+        self.energy_kev = energy_kev
+        self.batch_size = batch_size
+        self.seed = seed
+        self.workers = workers
+        self.worker_stats = []
+
+        if geometry is None:
+            geometry = CTGeometry(num_angles=36, num_detectors=64,
+                                  detector_spacing=0.6 * detector_distance / 64,
+                                  source_to_center=detector_distance / 2,
+                                  source_to_detector=detector_distance)
+        if phantom is None:
+            size = 64
+            rr, cc = np.ogrid[:size, :size]
+            cylinder = (rr - size / 2 + 0.5)**2 + (cc - size / 2 + 0.5)**2 < (size / 2)**2
+            phantom = np.where(cylinder, WATER_MU_PER_MM, 0.0)
+            pixel_size = pixel_size or detector_distance / (4 * size)
+        self.geometry = geometry
+        self.phantom = phantom
+        self.pixel_size = pixel_size or 1.0
 
-    def run_simulation(self):
-        interactions = np.random.rand(self.num_particles, 2) * self.detector_distance
-        return interactions
+    def run_simulation(self, progress=None):
+        options = dict(pixel_size=self.pixel_size, energy_kev=self.energy_kev,
+                       batch_size=self.batch_size, seed=self.seed)
+        if self.workers is not None and self.workers > 1:
+            tally, self.worker_stats = parallel_transport_photons(
+                self.phantom, self.geometry, self.num_particles, workers=self.workers, **options)
+            return tally
+        return transport_photons(self.phantom, self.geometry, self.num_particles,
+                                 progress=progress, **options)
 
     def analyze_results(self, interactions):
-        absorption_ratio = np.mean(interactions[:, 0] < self.detector_distance / 2)
+        total = max(interactions["num_photons"], 1)
+        primary = int(interactions["primary"].sum())
+        scatter = int(interactions["scatter"].sum())
         return {
             "total_particles": self.num_particles,
-            "absorbed_ratio": absorption_ratio
+            "absorbed_ratio": interactions["absorbed"] / total,
+            "primary_detected_ratio": primary / total,
+            "scatter_detected_ratio": scatter / total,
+            "scatter_to_primary": scatter / primary if primary else 0.0,
+            "compton_events": int(interactions["compton_events"]),
+            "rayleigh_events": int(interactions["rayleigh_events"]),
+            "workers": self.worker_stats,
         }
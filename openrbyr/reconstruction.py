@@ -1,18 +1,82 @@
 import numpy as np
 import matplotlib.pyplot as plt
 
-class MARTReconstruction:
-    def __init__(self, num_iterations=10):
+from core.geometry import ParallelBeamGeometry
+from core.iterative import ITERATIVE_METHODS
+from core.parallel_beam import ParallelBeamProjector
+from core.system_matrix import SystemMatrixProjector
+
+class IterativeReconstruction:
+    """
+    Iterative reconstruction (SART, SIRT, OS-SIRT, MART) of fan-beam sinograms.
+
+    The projector pair is built once from the geometry (and cached on disk via
+    core.system_matrix), then reused by every call to reconstruct. Parallel-beam
+    geometries use the matrix-free core.parallel_beam projector instead.
+    """
+
+    def __init__(self, geometry=None, image_shape=None, method="sart", num_iterations=10,
+                 num_subsets=10, relaxation=1.0, tol=None, pixel_size=1.0, projector=None,
+                 cache_dir=None):
+        if method not in ITERATIVE_METHODS:
+            raise ValueError(f"Unknown method '{method}'. Use one of {sorted(ITERATIVE_METHODS)}")
+        self.geometry = geometry
+        self.image_shape = image_shape
+        self.method = method
         self.num_iterations = num_iterations
+        self.num_subsets = num_subsets
+        self.relaxation = relaxation
+        self.tol = tol
+        self.pixel_size = pixel_size
+        self.cache_dir = cache_dir
+        self.projector = projector
+        self.residuals = []
+
+    def get_projector(self):
+        if self.projector is None:
+            if self.geometry is None or self.image_shape is None:
+                raise ValueError("A geometry and image_shape (or a projector) are required")
+            if isinstance(self.geometry, ParallelBeamGeometry):
+                self.projector = ParallelBeamProjector(self.geometry, self.image_shape, self.pixel_size)
+                return self.projector
+            self.projector = SystemMatrixProjector.from_geometry(
+                self.geometry, self.image_shape, self.pixel_size, cache_dir=self.cache_dir)
+        return self.projector
+
+    def reconstruct(self, projections, progress=None):
+        projector = self.get_projector()
+        self.residuals = []
 
-    def reconstruct(self, projections):
-        reconstructed_image = np.ones_like(projections)
-        for _ in range(self.num_iterations):
-            reconstructed_image *= projections / (np.sum(reconstructed_image, axis=0) + 1e-8)
-        return reconstructed_image
+        def record(iteration, image, residual):
+            self.residuals.append(residual)
+            if progress is not None:
+                progress((iteration + 1) / self.num_iterations)
+
+        kwargs = dict(num_iterations=self.num_iterations, relaxation=self.relaxation,
+                      tol=self.tol, callback=record)
+        if self.method not in ("sart", "sirt"):  # both fix their own subsets
+            kwargs["num_subsets"] = self.num_subsets
+        return ITERATIVE_METHODS[self.method](projector, np.asarray(projections), **kwargs)
 
     def visualize_reconstruction(self, image):
         plt.imshow(image, cmap='gray')
         plt.title("Reconstructed Image")
         plt.colorbar()
         plt.show()
+
+class MARTReconstruction(IterativeReconstruction):
+    """
+    MART reconstruction. Without a geometry or projector it falls back to the
+    original geometry-free column normalization of the projections.
+    """
+
+    def __init__(self, num_iterations=10, geometry=None, image_shape=None, **kwargs):
+        super().__init__(geometry, image_shape, method="mart", num_iterations=num_iterations, **kwargs)
+
+    def reconstruct(self, projections, progress=None):
+        if self.projector is None and self.geometry is None:
+            reconstructed_image = np.ones_like(projections)
+            for _ in range(self.num_iterations):
+                reconstructed_image *= projections / (np.sum(reconstructed_image, axis=0) + 1e-8)
+            return reconstructed_image
+        return super().reconstruct(projections, progress)
@@ -0,0 +1,236 @@
+"""
+Content-addressed cache of API results.
+
+Results are keyed by a SHA-256 of the endpoint name, the normalized request
+parameters, any input arrays and the library version. A size-bounded LRU
+holds recent results in memory; an optional directory keeps them across
+restarts, bounded by its own byte budget with least-recently-used files
+(by modification time, refreshed on every disk hit) removed first. Cached
+arrays are marked read-only because hits share them.
+"""
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from openrbyr import __version__
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 4 * 1024 * 1024 * 1024
+
+
+def request_key(endpoint, params, *arrays):
+    """
+    Hash one request.
+
+    Args:
+        endpoint (str): Endpoint name
+        params (dict): JSON-serializable request parameters; key order does not matter
+        *arrays (np.ndarray): Input arrays, hashed by dtype, shape and contents
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    digest = hashlib.sha256()
+    header = {"version": __version__, "endpoint": endpoint, "params": params}
+    digest.update(json.dumps(header, sort_keys=True, default=repr).encode("utf-8"))
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}{array.shape}".encode("utf-8"))
+        digest.update(array.data)
+    return digest.hexdigest()
+
+
+def _sizeof(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_sizeof(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def _freeze(value):
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _freeze(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _freeze(item)
+    return value
+
+
+class ResultCache:
+    """
+    LRU result cache bounded by the estimated size of its entries, with an
+    optional on-disk tier.
+
+    Example:
+        key = request_key("reconstruct", params, projections)
+        result = cache.get(key)
+        if result is None:
+            result = cache.put(key, compute(...))
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, cache_dir=None, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        """
+        Args:
+            max_bytes (int): Memory budget of the LRU tier; 0 disables it
+            cache_dir (str): Directory of the disk tier; None disables it
+            max_disk_bytes (int): Size budget of the files in cache_dir
+        """
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.current_bytes = 0
+        self.disk_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            with self._disk_lock:
+                self._shrink_disk()  # also counts what earlier runs left behind
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".pkl")
+
+    def _disk_files(self):
+        """(mtime, size, path) of every cached file, oldest first."""
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".pkl"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(files)
+
+    def _shrink_disk(self):
+        """Recount the disk tier and delete the least recently used files until it fits."""
+        files = self._disk_files()
+        self.disk_bytes = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if self.disk_bytes <= self.max_disk_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            self.disk_bytes -= size
+            self.disk_evictions += 1
+
+    def _remember(self, key, value):
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted
+                self.evictions += 1
+
+    def get(self, key):
+        """Cached result for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        if self.cache_dir:
+            try:
+                with open(self._path(key), "rb") as f:
+                    value = _freeze(pickle.load(f))
+                os.utime(self._path(key))  # mark it recently used
+            except (OSError, pickle.UnpicklingError, EOFError):
+                pass
+            else:
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                self._remember(key, value)
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """Store value under key and return it (with its arrays made read-only)."""
+        _freeze(value)
+        self._remember(key, value)
+        if self.cache_dir:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    size = f.tell()
+                with self._disk_lock:
+                    try:
+                        replaced = os.path.getsize(self._path(key))
+                    except OSError:
+                        replaced = 0
+                    os.replace(tmp_path, self._path(key))
+                    self.disk_bytes += size - replaced
+                    if self.disk_bytes > self.max_disk_bytes:
+                        self._shrink_disk()
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+        return value
+
+    def clear(self):
+        """Drop the memory tier (the disk tier is left alone; see purge)."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def purge(self):
+        """Drop both tiers, deleting every cached file."""
+        self.clear()
+        if self.cache_dir:
+            with self._disk_lock:
+                for _, _, path in self._disk_files():
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                self.disk_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "disk": bool(self.cache_dir),
+                "disk_bytes": self.disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+                "disk_evictions": self.disk_evictions,
+            }
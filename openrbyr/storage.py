@@ -0,0 +1,375 @@
+"""
+Chunked on-disk arrays for sinogram stacks and volumes larger than RAM.
+
+A store is a directory holding a JSON header and the data split along the
+first axis (angles for a sinogram, slices for a volume) into fixed-length
+.npy chunks:
+
+    scan/
+        header.json        dtype, item shape, length, chunk length, metadata
+        chunk-000000.npy   rows [0, chunk_length)
+        chunk-000001.npy   rows [chunk_length, 2 * chunk_length)
+        ...
+
+Chunks are memory-mapped on access, so reading an angle range or a slice only
+touches the chunks (and pages) it covers. Rows can be appended, which is how
+the streaming pipeline writes a scan block by block; the header is rewritten
+atomically after each append, so a reader never sees rows that are not fully
+written. A store has a single writer at a time.
+
+Geometry and acquisition parameters go in the header's metadata (see
+geometry_metadata and geometry_from_metadata).
+"""
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+FORMAT_NAME = "openrbyr-chunked"
+FORMAT_VERSION = 1
+HEADER_FILE = "header.json"
+
+# Default chunk size when chunk_length is not given.
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def _file_mode():
+    """Permissions of a newly created regular file under the process umask."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# Read once at import: os.umask can only be queried by setting it.
+FILE_MODE = _file_mode()
+
+
+def is_store(path):
+    """True if path is a directory written by ChunkedArray."""
+    return os.path.isfile(os.path.join(path, HEADER_FILE))
+
+
+class ChunkedArray:
+    """
+    Appendable, memory-mapped array stored in chunks along its first axis.
+
+    Indexing reads only what is asked for and returns a regular ndarray:
+    ``store[10:20]`` reads ten rows, ``store[5, :, 64]`` one line of row 5.
+    Assignment to existing rows and append need the store opened writable.
+
+    Example:
+        store = ChunkedArray.create("scan", (num_detectors,), metadata=geometry_metadata(geometry))
+        for lo, block in pipeline.stream(phantom):
+            store.append(block)
+        middle = ChunkedArray.open("scan")[90:100]
+    """
+
+    def __init__(self, path, header, mode="r"):
+        self.path = path
+        self.mode = mode
+        self._header = header
+
+    @classmethod
+    def create(cls, path, item_shape, dtype=np.float64, chunk_length=None, metadata=None, overwrite=False):
+        """
+        Create an empty store.
+
+        Args:
+            path (str): Store directory (must not exist, or be a store and overwrite set)
+            item_shape (Tuple[int, ...]): Shape of one row, e.g. (num_detectors,) or (H, W)
+            dtype: Element type
+            chunk_length (int): Rows per chunk file (defaults to ~64 MB chunks)
+            metadata (dict): JSON-serializable geometry/acquisition parameters
+            overwrite (bool): Replace an existing store at path (anything else
+                at path is never removed)
+
+        Returns:
+            ChunkedArray: The store, open for writing
+        """
+        dtype = np.dtype(dtype)
+        item_shape = tuple(int(n) for n in item_shape)
+        if chunk_length is None:
+            row_bytes = max(1, int(np.prod(item_shape)) * dtype.itemsize)
+            chunk_length = max(1, DEFAULT_CHUNK_BYTES // row_bytes)
+        if os.path.exists(path):
+            if not is_store(path):
+                raise FileExistsError(f"{path} already exists and is not a chunked array store")
+            if not overwrite:
+                raise FileExistsError(f"{path} already exists")
+            shutil.rmtree(path)
+        os.makedirs(path)
+        header = {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "dtype": dtype.str,
+            "item_shape": list(item_shape),
+            "length": 0,
+            "chunk_length": int(chunk_length),
+            "metadata": metadata or {},
+        }
+        store = cls(path, header, mode="r+")
+        store._write_header()
+        return store
+
+    @classmethod
+    def open(cls, path, mode="r"):
+        """
+        Open an existing store.
+
+        Args:
+            path (str): Store directory
+            mode (str): "r" for read-only, "r+" to also assign and append
+
+        Returns:
+            ChunkedArray: The store
+        """
+        if mode not in ("r", "r+"):
+            raise ValueError(f"Unsupported mode '{mode}'. Use 'r' or 'r+'")
+        if not is_store(path):
+            raise FileNotFoundError(f"No chunked array at {path}")
+        with open(os.path.join(path, HEADER_FILE)) as f:
+            header = json.load(f)
+        if header.get("format") != FORMAT_NAME or header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} {FORMAT_NAME} store")
+        return cls(path, header, mode)
+
+    @property
+    def dtype(self):
+        return np.dtype(self._header["dtype"])
+
+    @property
+    def item_shape(self):
+        return tuple(self._header["item_shape"])
+
+    @property
+    def shape(self):
+        return (self._header["length"],) + self.item_shape
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def nbytes(self):
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    @property
+    def chunk_length(self):
+        return self._header["chunk_length"]
+
+    @property
+    def metadata(self):
+        return self._header["metadata"]
+
+    def __len__(self):
+        return self._header["length"]
+
+    def __repr__(self):
+        return f"ChunkedArray({self.path!r}, shape={self.shape}, dtype={self.dtype})"
+
+    def __array__(self, dtype=None, copy=None):
+        array = self[:]
+        return array if dtype is None else array.astype(dtype, copy=False)
+
+    def update_metadata(self, **metadata):
+        """Merge entries into the stored metadata."""
+        self._check_writable()
+        self._header["metadata"].update(metadata)
+        self._write_header()
+
+    def _check_writable(self):
+        if self.mode == "r":
+            raise PermissionError(f"{self.path} is open read-only")
+
+    def _write_header(self):
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=".header-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self._header, f, indent=2)
+        # mkstemp creates the file owner-only; give the header the same mode as the chunks.
+        os.chmod(tmp, FILE_MODE)
+        os.replace(tmp, os.path.join(self.path, HEADER_FILE))
+
+    def _chunk_path(self, k):
+        return os.path.join(self.path, f"chunk-{k:06d}.npy")
+
+    def _chunk(self, k, mode="r"):
+        """Memory-map chunk k (created full-length and zeroed if it does not exist yet)."""
+        path = self._chunk_path(k)
+        if mode != "r" and not os.path.exists(path):
+            return np.lib.format.open_memmap(path, mode="w+", dtype=self.dtype,
+                                             shape=(self.chunk_length,) + self.item_shape)
+        return np.load(path, mmap_mode=mode)
+
+    def _rows(self, index):
+        """First-axis index -> (row numbers, whether that axis is dropped)."""
+        length = len(self)
+        if isinstance(index, (int, np.integer)):
+            row = int(index) + length if index < 0 else int(index)
+            if not 0 <= row < length:
+                raise IndexError(f"Row {index} out of range for length {length}")
+            return np.array([row]), True
+        if isinstance(index, slice):
+            return np.arange(*index.indices(length)), False
+        rows = np.asarray(index)
+        if rows.dtype == bool:
+            rows = np.nonzero(rows)[0]
+        rows = np.where(rows < 0, rows + length, rows).astype(np.intp)
+        if rows.size and (rows.min() < 0 or rows.max() >= length):
+            raise IndexError(f"Row index out of range for length {length}")
+        return rows, False
+
+    def _runs(self, rows):
+        """Split rows into (chunk, positions in rows, local selection) groups."""
+        chunks = rows // self.chunk_length
+        boundaries = np.flatnonzero(np.diff(chunks)) + 1
+        for group in np.split(np.arange(len(rows)), boundaries):
+            if not len(group):
+                continue
+            local = rows[group] - chunks[group[0]] * self.chunk_length
+            if len(local) > 1 and np.all(np.diff(local) == 1):
+                local = slice(int(local[0]), int(local[-1]) + 1)
+            elif len(local) == 1:
+                local = slice(int(local[0]), int(local[0]) + 1)
+            yield int(chunks[group[0]]), group, local
+
+    def __getitem__(self, key):
+        key = key if isinstance(key, tuple) else (key,)
+        if key and key[0] is Ellipsis:
+            key = (slice(None),) + key
+        rows, drop = self._rows(key[0] if key else slice(None))
+        rest = (slice(None),) + key[1:]
+        pieces = [self._chunk(k)[local][rest] for k, _, local in self._runs(rows)]
+        if pieces:
+            result = np.concatenate(pieces, axis=0) if len(pieces) > 1 else np.array(pieces[0])
+        else:
+            result = np.empty((0,) + self.item_shape, dtype=self.dtype)[rest]
+        return result[0] if drop else result
+
+    def __setitem__(self, key, value):
+        self._check_writable()
+        key = key if isinstance(key, tuple) else (key,)
+        rows, drop = self._rows(key[0] if key else slice(None))
+        rest = (slice(None),) + key[1:]
+        value = np.asarray(value, dtype=self.dtype)
+        if drop:
+            value = value[np.newaxis]
+        selected = np.broadcast_to(np.empty((), dtype=bool), self.item_shape)[key[1:]].shape
+        value = np.broadcast_to(value, (len(rows),) + selected)
+        for k, positions, local in self._runs(rows):
+            chunk = self._chunk(k, mode="r+")
+            view = chunk[local]
+            view[rest] = value[positions]
+            chunk.flush()
+
+    def append(self, block):
+        """
+        Append rows at the end.
+
+        Args:
+            block (np.ndarray): One row (item_shape) or a block of rows (n, *item_shape)
+
+        Returns:
+            int: The new length
+        """
+        self._check_writable()
+        block = np.asarray(block)
+        if block.shape == self.item_shape:
+            block = block[np.newaxis]
+        if block.shape[1:] != self.item_shape:
+            raise ValueError(f"Rows of shape {block.shape[1:]} do not match the store's {self.item_shape}")
+        length = len(self)
+        written = 0
+        while written < len(block):
+            k, offset = divmod(length + written, self.chunk_length)
+            n = min(self.chunk_length - offset, len(block) - written)
+            chunk = self._chunk(k, mode="r+")
+            chunk[offset:offset + n] = block[written:written + n]
+            chunk.flush()
+            del chunk
+            written += n
+        self._header["length"] = length + written
+        self._write_header()
+        return len(self)
+
+    def iter_chunks(self, start=0, stop=None):
+        """
+        Yield (first_row, rows) blocks aligned to the chunk files.
+
+        Args:
+            start (int): First row
+            stop (int): Row to stop before (defaults to the length)
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        lo = start
+        while lo < stop:
+            hi = min((lo // self.chunk_length + 1) * self.chunk_length, stop)
+            yield lo, self[lo:hi]
+            lo = hi
+
+
+def save_array(path, array, chunk_length=None, metadata=None, overwrite=False):
+    """
+    Write an array (or memmap) to a chunked store one chunk at a time.
+
+    Args:
+        path (str): Store directory
+        array (np.ndarray): Array to write; its first axis is the chunked one
+        chunk_length (int): Rows per chunk file (defaults to ~64 MB chunks)
+        metadata (dict): JSON-serializable metadata
+        overwrite (bool): Replace an existing store (never anything else)
+
+    Returns:
+        ChunkedArray: The written store
+    """
+    array = np.asarray(array) if not isinstance(array, np.ndarray) else array
+    if array.ndim == 0:
+        raise ValueError("Cannot store a 0-d array")
+    store = ChunkedArray.create(path, array.shape[1:], array.dtype, chunk_length, metadata, overwrite)
+    for lo in range(0, len(array), store.chunk_length):
+        store.append(array[lo:lo + store.chunk_length])
+    return store
+
+
+def geometry_metadata(geometry):
+    """
+    JSON-serializable description of a core.geometry scanner geometry.
+
+    Args:
+        geometry: CTGeometry, ConeBeamGeometry or ParallelBeamGeometry
+
+    Returns:
+        dict: {"type": class name, "parameters": constructor arguments}
+    """
+    parameters = {name: value.item() if isinstance(value, np.generic) else value
+                  for name, value in vars(geometry).items()}
+    return {"type": type(geometry).__name__, "parameters": parameters}
+
+
+def geometry_from_metadata(metadata):
+    """Rebuild the geometry described by geometry_metadata."""
+    from core import geometry as geometries
+
+    cls = {name: getattr(geometries, name)
+           for name in ("CTGeometry", "ConeBeamGeometry", "ParallelBeamGeometry")}.get(metadata["type"])
+    if cls is None:
+        raise ValueError(f"Unknown geometry type '{metadata['type']}'")
+    return cls(**metadata["parameters"])
+
+
+if __name__ == "__main__":
+    from core.geometry import CTGeometry
+
+    geometry = CTGeometry(num_angles=360, num_detectors=256, detector_spacing=1.0,
+                          source_to_center=500, source_to_detector=1000)
+    path = os.path.join(tempfile.mkdtemp(), "scan")
+    store = ChunkedArray.create(path, (geometry.num_detectors,), np.float32, chunk_length=64,
+                                metadata={"geometry": geometry_metadata(geometry)})
+    for lo in range(0, geometry.num_angles, 40):
+        store.append(np.full((40, geometry.num_detectors), lo, dtype=np.float32))
+
+    reopened = ChunkedArray.open(path)
+    print(reopened, "chunk files:", len([f for f in os.listdir(path) if f.startswith("chunk-")]))
+    print("Angles 118-122, detector 0:", reopened[118:123, 0])
+    geometry_from_metadata(reopened.metadata["geometry"]).describe()
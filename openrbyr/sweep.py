@@ -0,0 +1,386 @@
+"""
+Parameter sweeps over scanner, phantom and dose settings.
+
+A sweep spec (YAML or JSON) has fixed "base" parameters and a "grid" of
+parameter lists whose Cartesian product gives the sweep points:
+
+    base:
+      geometry: fan
+      num_angles: 360
+      detector_spacing: 1.0
+      source_to_detector: 1000
+      reconstruct: fbp
+    grid:
+      num_detectors: [256, 512]
+      source_to_center: [400, 500]
+      scale: [null, 1.0e+4, 1.0e+5]
+      phantom: [shepp_logan, breast_tissue]
+
+Any key can be in either section; see DEFAULTS for the parameters and
+config.scanner_config.geometry_from_config for the geometry keys.
+
+Shared work is done once. Each unique geometry's system matrix is built
+before the sweep, one task per geometry, and cached on disk in the output
+directory. Points that share a geometry and phantom form one task, which
+projects the clean sinogram once and then applies every dose/noise setting
+to it. Tasks run on a process pool.
+
+Every finished point writes its outputs and a result.json under
+points/<id>/, and gets a line in manifest.jsonl. Running the same spec into
+the same output directory again skips finished points, so an interrupted
+sweep resumes where it stopped and an extended grid only runs its new points.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from config.scanner_config import geometry_from_config, load_config
+from core.analytic_phantoms import analytic_sinogram, breast_tissue_shapes, shepp_logan_shapes
+from core.backprojection import fan_beam_fbp
+from core.geometry import ParallelBeamGeometry
+from core.iterative import ITERATIVE_METHODS
+from core.noise_models import noise_realizations
+from core.parallel_beam import parallel_beam_fbp
+from core.phantom_loader import load_image_phantom
+from core.phantoms import generate_breast_tissue, generate_shepp_logan
+from core.system_matrix import SystemMatrixProjector, get_system_matrix
+from openrbyr.storage import geometry_metadata, save_array
+
+DEFAULTS = {
+    "geometry": "fan",
+    "num_angles": 360,
+    "phantom": "shepp_logan",     # shepp_logan, breast_tissue or an image file
+    "image_size": 256,
+    "pixel_size": 1.0,
+    "projector": "matrix",        # "matrix" (ray-traced system matrix) or "analytic"
+    "scale": None,                # incident photons; None for a noise-free sinogram
+    "electronic_std": 0.0,
+    "realizations": 1,
+    "seed": 0,
+    "reconstruct": "fbp",         # "fbp", an ITERATIVE_METHODS name, or None
+    "num_iterations": 10,
+    "save_sinograms": True,
+}
+
+# Parameters that determine the geometry and hence the system matrix.
+GEOMETRY_KEYS = ("geometry", "num_angles", "num_detectors", "detector_spacing", "source_to_center",
+                 "source_to_detector", "angular_range", "radius", "num_rows", "row_spacing", "detector_type",
+                 "image_size", "pixel_size")
+
+# Geometries the sweep can simulate: projection and reconstruction here are 2D.
+SWEEP_GEOMETRIES = ("fan", "parallel")
+
+# Parameters that, with the geometry, determine the clean sinogram.
+SINOGRAM_KEYS = GEOMETRY_KEYS + ("phantom", "projector")
+
+SHAPE_PHANTOMS = {"shepp_logan": shepp_logan_shapes, "breast_tissue": breast_tissue_shapes}
+IMAGE_PHANTOMS = {"shepp_logan": generate_shepp_logan, "breast_tissue": generate_breast_tissue}
+
+INTEGER_KEYS = ("num_angles", "num_detectors", "num_rows", "image_size", "realizations", "seed", "num_iterations")
+FLOAT_KEYS = ("detector_spacing", "source_to_center", "source_to_detector", "angular_range", "radius",
+              "row_spacing", "pixel_size", "scale", "electronic_std")
+
+MANIFEST_FILE = "manifest.jsonl"
+
+
+def load_spec(path):
+    """Read a sweep spec (YAML or JSON) and check its layout."""
+    spec = load_config(path) or {}
+    unknown = set(spec) - {"base", "grid", "output"}
+    if unknown:
+        raise ValueError(f"Unknown sweep spec sections: {sorted(unknown)}")
+    for name, values in (spec.get("grid") or {}).items():
+        if not isinstance(values, list) or not values:
+            raise ValueError(f"Grid entry '{name}' must be a non-empty list")
+    return spec
+
+
+def expand_grid(spec):
+    """
+    Expand a spec into its sweep points.
+
+    Args:
+        spec (dict): {"base": {...}, "grid": {name: [values]}}
+
+    Returns:
+        List[dict]: Full parameter sets (DEFAULTS < base < grid), in grid order
+    """
+    base = dict(DEFAULTS, **(spec.get("base") or {}))
+    grid = spec.get("grid") or {}
+    names = list(grid)
+    return [_normalize(dict(base, **dict(zip(names, combo))))
+            for combo in itertools.product(*(grid[n] for n in names))]
+
+
+def _normalize(params):
+    """Coerce numeric parameters (YAML reads e.g. 1.0e4 as a string) and check the geometry kind."""
+    if params["geometry"] not in SWEEP_GEOMETRIES:
+        raise ValueError(f"Sweeps support the {list(SWEEP_GEOMETRIES)} geometries, not '{params['geometry']}' "
+                         f"(there is no 3D projection or FDK path in the sweep)")
+    for keys, cast in ((INTEGER_KEYS, int), (FLOAT_KEYS, float)):
+        for key in keys:
+            if params.get(key) is not None:
+                params[key] = cast(params[key])
+    return params
+
+
+def _digest(params, keys=None):
+    selected = {k: params.get(k) for k in keys} if keys is not None else params
+    return hashlib.sha256(json.dumps(selected, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def point_id(params):
+    """Stable identifier of a sweep point (hash of all its parameters)."""
+    return _digest(params)[:16]
+
+
+def _geometry(params):
+    return geometry_from_config(params)
+
+
+def _image_shape(params):
+    return (params["image_size"], params["image_size"])
+
+
+def _matrix_cache(output_dir):
+    return os.path.join(output_dir, "system_matrix")
+
+
+def _needs_matrix(params):
+    return params["projector"] == "matrix" or params["reconstruct"] in ITERATIVE_METHODS
+
+
+def _prepare_matrix(params, output_dir):
+    """Build (or find) the cached system matrix of one geometry."""
+    matrix = get_system_matrix(_geometry(params), _image_shape(params), params["pixel_size"],
+                               cache_dir=_matrix_cache(output_dir))
+    return matrix.nnz
+
+
+def _phantom(params):
+    name = params["phantom"]
+    if name in IMAGE_PHANTOMS:
+        return IMAGE_PHANTOMS[name](params["image_size"])
+    return load_image_phantom(name, _image_shape(params))
+
+
+def _clean_sinogram(params, geometry, phantom, matrix):
+    if params["projector"] == "analytic":
+        if params["phantom"] not in SHAPE_PHANTOMS:
+            raise ValueError(f"The analytic projector needs one of {sorted(SHAPE_PHANTOMS)} as phantom")
+        shapes = SHAPE_PHANTOMS[params["phantom"]](params["image_size"], params["pixel_size"])
+        return analytic_sinogram(shapes, geometry)
+    if params["projector"] != "matrix":
+        raise ValueError(f"Unknown projector '{params['projector']}'. Use 'matrix' or 'analytic'")
+    return (matrix @ np.ravel(phantom)).reshape(geometry.num_angles, geometry.num_detectors)
+
+
+def _reconstruct(params, geometry, sinogram, matrix):
+    method = params["reconstruct"]
+    image_shape = _image_shape(params)
+    if method == "fbp":
+        fbp = parallel_beam_fbp if isinstance(geometry, ParallelBeamGeometry) else fan_beam_fbp
+        return fbp(sinogram, geometry, image_shape, params["pixel_size"])
+    if method not in ITERATIVE_METHODS:
+        raise ValueError(f"Unknown reconstruction '{method}'. Use 'fbp' or one of {sorted(ITERATIVE_METHODS)}")
+    projector = SystemMatrixProjector(matrix, sinogram.shape, image_shape)
+    return ITERATIVE_METHODS[method](projector, sinogram, num_iterations=params["num_iterations"])
+
+
+def _write_json(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+def _run_point(params, geometry, phantom, clean, matrix, point_dir):
+    start = time.perf_counter()
+    os.makedirs(point_dir, exist_ok=True)
+    if params["scale"] is None:
+        sinograms = clean[np.newaxis]
+    else:
+        sinograms = noise_realizations(clean, params["realizations"], params["scale"], params["electronic_std"],
+                                       rng=params["seed"], workers=1)
+    metadata = {"params": params, "geometry": geometry_metadata(geometry)}
+    if params["save_sinograms"]:
+        save_array(os.path.join(point_dir, "sinograms"), sinograms, metadata=metadata, overwrite=True)
+
+    metrics = {}
+    if params["reconstruct"]:
+        images = np.stack([_reconstruct(params, geometry, sinogram, matrix) for sinogram in sinograms])
+        save_array(os.path.join(point_dir, "reconstructions"), images, metadata=metadata, overwrite=True)
+        rmse = np.sqrt(np.mean((images - phantom)**2, axis=(1, 2)))
+        metrics = {"rmse_mean": float(rmse.mean()), "rmse_std": float(rmse.std())}
+    result = {"id": point_id(params), "params": params, "status": "done", "metrics": metrics,
+              "elapsed": time.perf_counter() - start}
+    _write_json(os.path.join(point_dir, "result.json"), result)
+    return result
+
+
+def _run_group(points, output_dir):
+    """Run points sharing a geometry and phantom: one clean sinogram, then each point's noise and reconstruction."""
+    first = points[0]
+    try:
+        geometry = _geometry(first)
+        matrix = None
+        if any(_needs_matrix(p) for p in points):
+            matrix = get_system_matrix(geometry, _image_shape(first), first["pixel_size"],
+                                       cache_dir=_matrix_cache(output_dir))
+        phantom = _phantom(first)
+        clean = _clean_sinogram(first, geometry, phantom, matrix)
+    except Exception as error:
+        # Shared setup failed (bad phantom path, geometry, ...): so does every point of the group.
+        return [_failed(params, error) for params in points]
+    results = []
+    for params in points:
+        try:
+            results.append(_run_point(params, geometry, phantom, clean, matrix,
+                                      os.path.join(output_dir, "points", point_id(params))))
+        except Exception as error:
+            results.append(_failed(params, error))
+    return results
+
+
+def _failed(params, error):
+    return {"id": point_id(params), "params": params, "status": "failed", "error": repr(error)}
+
+
+def load_manifest(output_dir, repair=True):
+    """
+    Finished points of a sweep directory, {id: result}.
+
+    Point directories with a result.json that never made it into the manifest
+    (the sweep was interrupted between the two) count as finished, and with
+    repair they are also added to it; repair=False leaves the directory untouched.
+    """
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line cut short by an interruption
+                if entry.get("status") == "done":
+                    done[entry["id"]] = entry
+    points_dir = os.path.join(output_dir, "points")
+    if os.path.isdir(points_dir):
+        for name in sorted(set(os.listdir(points_dir)) - set(done)):
+            result_path = os.path.join(points_dir, name, "result.json")
+            if os.path.exists(result_path):
+                with open(result_path) as f:
+                    done[name] = json.load(f)
+                if repair:
+                    _append_manifest(output_dir, done[name])
+    return done
+
+
+def _append_manifest(output_dir, entry):
+    with open(os.path.join(output_dir, MANIFEST_FILE), "a") as f:
+        f.write(json.dumps(entry, default=str) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def run_sweep(spec, output_dir, workers=None, log=print):
+    """
+    Run every unfinished point of a sweep.
+
+    Args:
+        spec (dict or str): Sweep spec or the path of a YAML/JSON spec file
+        output_dir (str): Sweep directory (manifest, cached matrices, point outputs)
+        workers (int): Processes (default: CPU count); 1 runs in this process
+        log (callable): Progress output; None for silence
+
+    Returns:
+        List[dict]: Results of all points in grid order (finished earlier or now)
+    """
+    log = log or (lambda *args: None)
+    if not isinstance(spec, dict):
+        spec = load_spec(spec)
+    points = expand_grid(spec)
+    os.makedirs(output_dir, exist_ok=True)
+    done = load_manifest(output_dir)
+    todo = [p for p in points if point_id(p) not in done]
+    log(f"{len(points)} points, {len(points) - len(todo)} already done, {len(todo)} to run")
+
+    matrices = {_digest(p, GEOMETRY_KEYS): p for p in todo if _needs_matrix(p)}
+    groups = {}
+    for p in todo:
+        groups.setdefault(_digest(p, SINOGRAM_KEYS), []).append(p)
+    log(f"{len(matrices)} system matrices, {len(groups)} clean sinograms")
+
+    workers = workers or os.cpu_count() or 1
+    results = dict(done)
+
+    def record(group_results):
+        for result in group_results:
+            _append_manifest(output_dir, result)
+            if result["status"] == "done":
+                results[result["id"]] = result
+                log(f"  {result['id']} done in {result['elapsed']:.2f} s {result['metrics']}")
+            else:
+                log(f"  {result['id']} failed: {result['error']}")
+
+    def matrix_failed(params, error):
+        # Its groups retry the build and record their points as failed.
+        log(f"  system matrix for {_digest(params, GEOMETRY_KEYS)[:16]} failed: {error!r}")
+
+    if workers == 1:
+        for p in matrices.values():
+            try:
+                _prepare_matrix(p, output_dir)
+            except Exception as error:
+                matrix_failed(p, error)
+        for group in groups.values():
+            record(_run_group(group, output_dir))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Matrices first, one task per geometry, so groups only load them.
+            builds = {pool.submit(_prepare_matrix, p, output_dir): p for p in matrices.values()}
+            for future in as_completed(builds):
+                if future.exception() is not None:
+                    matrix_failed(builds[future], future.exception())
+            futures = [pool.submit(_run_group, group, output_dir) for group in groups.values()]
+            for future in as_completed(futures):
+                record(future.result())
+    return [results.get(point_id(p), {"id": point_id(p), "params": p, "status": "failed"}) for p in points]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="openrbyr-sweep", description="Run a parameter sweep.")
+    parser.add_argument("spec", help="Sweep spec (.yaml or .json)")
+    parser.add_argument("--output", help="Sweep directory (default: the spec's 'output' entry)")
+    parser.add_argument("--workers", type=int, help="Processes (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="List the points without running them")
+    args = parser.parse_args(argv)
+
+    spec = load_spec(args.spec)
+    output_dir = args.output or spec.get("output")
+    if not output_dir:
+        parser.error("no output directory: pass --output or set 'output' in the spec")
+    if args.dry_run:
+        done = load_manifest(output_dir, repair=False) if os.path.isdir(output_dir) else {}
+        for params in expand_grid(spec):
+            status = "done" if point_id(params) in done else "todo"
+            grid = {k: params[k] for k in (spec.get("grid") or {})}
+            print(point_id(params), status, grid)
+        return 0
+    results = run_sweep(spec, output_dir, workers=args.workers)
+    failed = [r for r in results if r["status"] != "done"]
+    print(f"{len(results) - len(failed)} of {len(results)} points done")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,13 +2,32 @@ import numpy as np
 import os
 import json
 
-def save_array_to_file(array, filename):
-    np.save(filename, array)
+from .storage import ChunkedArray, is_store, save_array
+
+STORE_SUFFIX = ".store"
+
+def save_array_to_file(array, filename, chunked=False, metadata=None, chunk_length=None, overwrite=False):
+    """
+    Save an array with np.save, or as a chunked store (openrbyr.storage) when
+    chunked=True or the filename ends in .store. overwrite only ever replaces
+    an existing store.
+    """
+    if chunked or filename.endswith(STORE_SUFFIX):
+        save_array(filename, array, chunk_length=chunk_length, metadata=metadata, overwrite=overwrite)
+    else:
+        np.save(filename, array)
     print(f"Array saved to {filename}")
 
-def load_array_from_file(filename):
+def load_array_from_file(filename, lazy=False):
+    """
+    Load a chunked store or a .npy file. With lazy=True nothing is read up
+    front: stores come back as a ChunkedArray and .npy files memory-mapped.
+    """
+    if is_store(filename):
+        store = ChunkedArray.open(filename)
+        return store if lazy else store[:]
     if os.path.exists(filename):
-        return np.load(filename)
+        return np.load(filename, mmap_mode="r" if lazy else None)
     else:
         print(f"File {filename} not found.")
         return None
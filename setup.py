@@ -14,6 +14,7 @@ setup(
     packages=find_packages(),
     install_requires=[
         "numpy",
+        "scipy",
         "matplotlib",
         "fastapi",
         "uvicorn",
@@ -23,6 +24,11 @@ setup(
         "plotly",
         "opencv-python"
     ],
+    extras_require={
+        "numba": ["numba"],
+        "dicom": ["pydicom"],
+        "nifti": ["nibabel"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -32,6 +38,8 @@ setup(
     entry_points={
         "console_scripts": [
             "openrbyr-api=api_server:app",
+            "openrbyr-bench=openrbyr.benchmarks.__main__:main",
+            "openrbyr-sweep=openrbyr.sweep:main",
         ],
     },
 )